@@ -0,0 +1,233 @@
+"""Benchmark suite for the computed_tomography package.
+
+Times the construction of matrix A (the geometry), forward projection, simulating a noisy acquisition and every
+reconstruction method (some of them also with matrix A stored in 32-bit floats) on synthetic phantoms (Shepp-Logan
+and random disks), across image sizes, numbers of beams and numbers of directions, for both the parallel and the fan
+beam array modes. The results are written as JSON, one record per measurement, together with the commit and the
+versions they were measured with, so that runs on different commits can be compared:
+
+    python run_benchmarks.py --preset quick --output before.json
+    python run_benchmarks.py --preset quick --output after.json --compare before.json
+
+Each measurement is the best (and the median) of a number of repeats, after one untimed warm-up run."""
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import subprocess
+from contextlib import redirect_stdout
+from statistics import median
+
+# run against the package next to this folder, and make the fast_fourier_transform package (needed by filtered
+# back-projection) importable when the repository is laid out as usual
+benchmarkFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkFolder))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(benchmarkFolder)), "Fast Fourier Transform"))
+
+import numpy
+from numpy import linspace, zeros, float32
+from numpy.linalg import norm
+from computed_tomography import *
+
+# the cases run by each preset; every combination of the listed values is benchmarked
+presets = {"quick": {"modes": ["parallel", "fan"],
+                     "imageSizes": [16, 32],
+                     "beamCounts": [32],
+                     "directionCounts": [36],
+                     "phantoms": ["shepp_logan"],
+                     "iterations": 2,
+                     "repeats": 3},
+           "full": {"modes": ["parallel", "fan"],
+                    "imageSizes": [32, 64, 128],
+                    "beamCounts": [64, 128],
+                    "directionCounts": [60, 180],
+                    "phantoms": ["shepp_logan", "disks"],
+                    "iterations": 4,
+                    "repeats": 3}}
+
+# dense matrices with more entries than this are not built, since they would not fit in memory
+maxDenseEntries = 5e7
+
+# the number of photons per beam and the detector blur of the simulated noisy acquisitions
+incidentPhotons = 1e4
+detectorBlur = 0.5
+
+def make_beam_array(mode, numberOfBeams):
+    """Returns a beam array of the given mode whose beams cover the whole image."""
+
+    if mode == "parallel":
+        return beam_array_parallel(numberOfBeams, 90, 1)
+    return beam_array_fan_mode(numberOfBeams, 90, 1)
+
+def make_phantom(phantom, imageSize):
+    """Returns the pixel densities of a square phantom of the given size."""
+
+    if phantom == "shepp_logan":
+        return shepp_logan_phantom(imageSize, imageSize)
+    return disk_phantom(imageSize, imageSize)
+
+def measure(function, repeats):
+    """Runs a function once to warm up and then a number of times, and returns its last result together with the
+    best and the median time in seconds. Anything the function prints is discarded."""
+
+    times = []
+    with redirect_stdout(io.StringIO()):
+        result = function()
+        for r in range(repeats):
+            time1 = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - time1)
+
+    return result, min(times), median(times)
+
+def relative_error(approxX, vectorX):
+    """Returns ||approxX - X|| / ||X||."""
+    return float(norm(approxX - vectorX) / norm(vectorX))
+
+def benchmark_case(mode, imageSize, numberOfBeams, numberOfDirections, phantom, iterations, repeats):
+    """Benchmarks one combination of settings and returns a list of records."""
+
+    case = {"mode": mode, "imageSize": imageSize, "numberOfBeams": numberOfBeams,
+            "numberOfDirections": numberOfDirections, "phantom": phantom}
+    records = []
+
+    def record(stage, best, middle, relativeError=None):
+        records.append(dict(case, stage=stage, seconds=best, medianSeconds=middle, repeats=repeats,
+                            relativeError=relativeError))
+
+    beamArray = make_beam_array(mode, numberOfBeams)
+    pixelGrid = pixel_grid(imageSize, imageSize)
+    scanningAngles = linspace(0, 360, numberOfDirections + 1)[:-1]
+    vectorX = make_phantom(phantom, imageSize).flatten()
+
+    # geometry: building matrix A
+    matrixA, best, middle = measure(lambda: system_matrix(pixelGrid, beamArray, scanningAngles, "sparse"), repeats)
+    record("geometry_sparse", best, middle)
+    if matrixA.shape[0] * matrixA.shape[1] <= maxDenseEntries:
+        _, best, middle = measure(lambda: system_matrix(pixelGrid, beamArray, scanningAngles, "dense"), repeats)
+        record("geometry_dense", best, middle)
+
+    # forward projection: computing the sinogram
+    vectorB, best, middle = measure(lambda: matrixA @ vectorX, repeats)
+    record("forward_projection_sparse", best, middle)
+    matrixA32 = system_matrix(pixelGrid, beamArray, scanningAngles, "sparse", dtype=float32)
+    vectorX32 = vectorX.astype(float32)
+    _, best, middle = measure(lambda: matrixA32 @ vectorX32, repeats)
+    record("forward_projection_sparse_float32", best, middle)
+    operatorA = projection_operator(pixelGrid, beamArray, scanningAngles)
+    _, best, middle = measure(lambda: operatorA @ vectorX, repeats)
+    record("forward_projection_operator", best, middle)
+
+    # noisy acquisition: the same noise is drawn in every repeat, so the noisy reconstruction is repeatable
+    acquisition = acquisition_simulator(incidentPhotons, detectorBlur=detectorBlur, seed=0)
+    def simulate():
+        acquisition.reset()
+        return acquisition.simulate(vectorB, numberOfBeams)
+    noisyB, best, middle = measure(simulate, repeats)
+    record("acquisition", best, middle)
+
+    # reconstruction with each method
+    initialX = zeros(vectorX.shape[0])
+    initialX32 = zeros(vectorX.shape[0], float32)
+    rowBlocks = view_blocks(numberOfDirections, numberOfBeams, numberOfDirections)
+    projections = projection_set(matrixA)
+    methods = {"kaczmarz": lambda: projection_iterates(initialX, projections, vectorB, iterations),
+               "sirt": lambda: simultaneous_iterates(initialX, matrixA, vectorB, iterations),
+               "sart": lambda: simultaneous_iterates(initialX, matrixA, vectorB, iterations, rowBlocks),
+               "sart_noisy": lambda: simultaneous_iterates(initialX, matrixA, noisyB, iterations, rowBlocks),
+               "sart_float32": lambda: simultaneous_iterates(initialX32, matrixA32, vectorB, iterations, rowBlocks),
+               "cgls": lambda: cgls_iterates(initialX, matrixA, vectorB, iterations),
+               "lsqr": lambda: lsqr_iterates(initialX, matrixA, vectorB, iterations),
+               "cgls_float32": lambda: cgls_iterates(initialX32, matrixA32, vectorB, iterations),
+               "cgls_operator": lambda: cgls_iterates(initialX, operatorA, vectorB, iterations),
+               "fbp": lambda: filtered_back_projection(vectorB.reshape((numberOfDirections, numberOfBeams)),
+                                                       pixelGrid, beamArray, scanningAngles)}
+    for method, reconstruct in methods.items():
+        try:
+            approxX, best, middle = measure(reconstruct, repeats)
+        except Exception as error:
+            print(f"  skipped {method}: {error}")
+            continue
+        record(f"reconstruct_{method}", best, middle, relative_error(approxX, vectorX))
+
+    return records
+
+def git_commit():
+    """Returns the commit of the repository the benchmarks run in, or None outside of a git repository."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=benchmarkFolder, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(preset):
+    """Runs every case of a preset and returns the results with the information needed to reproduce them."""
+
+    settings = presets[preset]
+    records = []
+    for mode in settings["modes"]:
+        for imageSize in settings["imageSizes"]:
+            for numberOfBeams in settings["beamCounts"]:
+                for numberOfDirections in settings["directionCounts"]:
+                    for phantom in settings["phantoms"]:
+                        print(f"{mode} mode, {imageSize} x {imageSize} {phantom}, {numberOfBeams} beams, "
+                              f"{numberOfDirections} directions")
+                        records += benchmark_case(mode, imageSize, numberOfBeams, numberOfDirections, phantom,
+                                                  settings["iterations"], settings["repeats"])
+
+    return {"preset": preset,
+            "settings": settings,
+            "commit": git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.platform(),
+            "processor": platform.processor(),
+            "records": records}
+
+def record_key(record):
+    """Returns the settings and stage which identify a measurement across runs."""
+    return (record["mode"], record["imageSize"], record["numberOfBeams"], record["numberOfDirections"],
+            record["phantom"], record["stage"])
+
+def compare_results(baseResults, newResults):
+    """Prints how many times faster each measurement of newResults is than the same measurement of baseResults."""
+
+    baseRecords = {record_key(record): record for record in baseResults["records"]}
+    print(f"\nSpeedup of {newResults['commit']} over {baseResults['commit']} (best times):")
+    for record in newResults["records"]:
+        baseRecord = baseRecords.get(record_key(record))
+        if baseRecord is None or record["seconds"] == 0:
+            continue
+        speedup = baseRecord["seconds"] / record["seconds"]
+        print(f"  {' / '.join(str(value) for value in record_key(record))}: {baseRecord['seconds']:.4f} s -> "
+              f"{record['seconds']:.4f} s ({speedup:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the computed_tomography package.")
+    parser.add_argument("--preset", choices=sorted(presets), default="quick", help="the set of cases to run")
+    parser.add_argument("--output", default=None,
+                        help="the JSON file to write (by default, results/<preset>_<commit>.json in this folder)")
+    parser.add_argument("--compare", default=None, help="a JSON file of earlier results to compare with")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.preset)
+
+    outputPath = arguments.output
+    if outputPath is None:
+        outputPath = os.path.join(benchmarkFolder, "results",
+                                  f"{arguments.preset}_{(results['commit'] or 'unknown')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(outputPath)), exist_ok=True)
+    with open(outputPath, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {outputPath}")
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            compare_results(json.load(file), results)
@@ -1,7 +1,27 @@
+from computed_tomography.cls_acquisition_simulator import acquisition_simulator
 from computed_tomography.cls_beam import beam
+from computed_tomography.cls_beam_array import beam_array
 from computed_tomography.cls_beam_array_fan_mode import beam_array_fan_mode
 from computed_tomography.cls_beam_array_parallel import beam_array_parallel
 from computed_tomography.cls_CAT_Scanner import CAT_Scanner
+from computed_tomography.cls_CAT_Batch_Scanner import CAT_Batch_Scanner
+from computed_tomography.cls_CAT_Volume_Scanner import CAT_Volume_Scanner
+from computed_tomography.cls_convergence_monitor import convergence_monitor
+from computed_tomography.cls_ct_hooks import ct_hooks, print_hooks, metrics_collector
+from computed_tomography.cls_ct_storage import ct_storage
+from computed_tomography.cls_density_constraints import density_constraints
 from computed_tomography.cls_pixel_grid import pixel_grid
+from computed_tomography.cls_projection_operator import projection_operator
+from computed_tomography.cls_projection_set import projection_set
+from computed_tomography.cls_sparse_matrix import sparse_matrix
+from computed_tomography.cls_streaming_reconstructor import streaming_reconstructor
+from computed_tomography.cls_system_matrix_cache import system_matrix_cache
 from computed_tomography.func_projection_hyperplane import projection_hyperplane
-from computed_tomography.func_projection_iterates import projection_iterates
\ No newline at end of file
+from computed_tomography.func_projection_iterates import projection_iterates
+from computed_tomography.func_row_orderings import row_ordering, view_ordering
+from computed_tomography.func_simultaneous_iterates import simultaneous_iterates, view_blocks
+from computed_tomography.func_filtered_back_projection import filtered_back_projection
+from computed_tomography.func_krylov_iterates import cgls_iterates, lsqr_iterates
+from computed_tomography.func_phantoms import shepp_logan_phantom, disk_phantom, phantom_image
+from computed_tomography.func_system_matrix import system_matrix
+from computed_tomography.var_solvers import linearSolvers
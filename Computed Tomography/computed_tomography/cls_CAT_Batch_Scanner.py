@@ -0,0 +1,67 @@
+from computed_tomography.cls_CAT_Scanner import *
+from numpy import stack
+
+
+class CAT_Batch_Scanner(CAT_Scanner):
+    """A class which simulates Computed Tomography (CT) scans on a stack of images of the same size with one
+    constructed beam array. The scan geometry (matrix A) is built once for all images, the sinograms of all images
+    are computed in one matrix-matrix product, and all images are reconstructed together."""
+
+    def __init__(self, imageObjs, beamArray, doConvertToGrayscale: bool = True, matrixCache=None, hooks=None):
+        """Initialize a CAT Scanner on a list of images of the same size with a beam array. See CAT_Scanner for the
+        matrixCache and the hooks."""
+
+        self.images = list(imageObjs)
+        self.numberOfImages = len(self.images)
+        if self.numberOfImages == 0:
+            raise Exception("Expected at least one image to scan.")
+
+        super().__init__(self.images[0], beamArray, doConvertToGrayscale, matrixCache, hooks)
+        self.pixelDensityArr = self.to_pixel_density_stack(self.images, doConvertToGrayscale)
+
+    def to_pixel_density_stack(self, imageObjs, doConvertToGrayscale):
+        """Converts each image to an array of pixel densities and returns them stacked in a three-dimensional array
+        with one image per layer."""
+
+        for imageObj in imageObjs:
+            if imageObj.size != (self.imageWidth, self.imageHeight):
+                raise Exception(f"Expected all images to have the size {self.imageWidth} x {self.imageHeight}; "
+                                f"received an image of size {imageObj.size[0]} x {imageObj.size[1]}.")
+
+        return stack([self.to_pixel_densities(imageObj, doConvertToGrayscale) for imageObj in imageObjs])
+
+    def change_images(self, newImageObjs, doConvertToGrayscale: bool = True):
+        """Switches the images of the scanner to another list of image objects. Images of the same size keep using
+        the matrices A in the scanner's cache."""
+
+        self.images = list(newImageObjs)
+        self.numberOfImages = len(self.images)
+        self.change_image(self.images[0], doConvertToGrayscale)
+        self.pixelDensityArr = self.to_pixel_density_stack(self.images, doConvertToGrayscale)
+
+    def density_vector(self):
+        """Returns the pixel densities of the images as a two-dimensional array with one flattened image in each
+        column, which is the matrix X of the scan."""
+        return self.pixelDensityArr.reshape((self.numberOfImages, self.numberOfPixels)).T
+
+    def reconstruct_images(self, iterations: int = None, method="sart", numberOfBlocks: int = None,
+                           relaxation: float = 1.0, convergenceMonitor=None, storage=None,
+                           ordering: str = "natural", constraints=None, seed: int = None):
+        """Reconstruct grayscale versions of all scanned images at once and return them as a list of images. See
+        CAT_Scanner.reconstruct_densities for the available methods."""
+
+        matrixApproxX = self.reconstruct_densities(iterations, method, numberOfBlocks, relaxation,
+                                                   convergenceMonitor, storage, ordering,
+                                                   constraints, seed=seed)
+        return [Image.fromarray(self.to_color_values(matrixApproxX[:, k])) for k in range(self.numberOfImages)]
+
+    def reconstruct_image(self, iterations: int = None, method="sart", numberOfBlocks: int = None,
+                          relaxation: float = 1.0, convergenceMonitor=None, storage=None,
+                          ordering: str = "natural", constraints=None, seed: int = None):
+        """Reconstruct all scanned images and return the grayscale version of the first one; use
+        CAT_Batch_Scanner.reconstruct_images to get all of them."""
+        return self.reconstruct_images(iterations, method, numberOfBlocks, relaxation, convergenceMonitor,
+                                       storage, ordering, constraints, seed)[0]
+
+    def __repr__(self):
+        return f"CAT_Batch_Scanner of {self.numberOfImages} images of size {self.imageWidth} x {self.imageHeight}"
@@ -1,39 +1,75 @@
-from computed_tomography.cls_pixel_grid import *
+from computed_tomography.cls_system_matrix_cache import *
+from computed_tomography.func_system_matrix import *
 from computed_tomography.func_projection_iterates import *
-from numpy import nditer, linspace, matmul, uint8
+from computed_tomography.func_simultaneous_iterates import *
+from computed_tomography.var_solvers import *
+from computed_tomography.func_row_orderings import *
+from computed_tomography.func_filtered_back_projection import *
+from computed_tomography.cls_streaming_reconstructor import *
+from computed_tomography.cls_ct_storage import *
+from computed_tomography.cls_acquisition_simulator import *
+from computed_tomography.cls_density_constraints import *
+from computed_tomography.func_multiresolution import *
+from numpy import array, asarray, zeros, column_stack, repeat, clip, ceil, einsum, linspace, uint8, float32, float64
 from PIL import Image
-from math import ceil
 from time import time
+from copy import copy
+import numpy
 
 
 class CAT_Scanner:
     """A class which simulates a Computed Tomography (CT) scan on a given image with a constructed beam array."""
 
-    def __init__(self, imageObj, beamArray, doConvertToGrayscale: bool = True):
-        """Initialize a CAT Scanner on an image with a beam array."""
+    def __init__(self, imageObj, beamArray, doConvertToGrayscale: bool = True, matrixCache=None, hooks=None):
+        """Initialize a CAT Scanner on an image with a beam array.
+
+        Matrices A built during scans are kept in matrixCache, a system_matrix_cache which may be shared between
+        scanners or saved to a directory; by default, each scanner keeps the matrix of its latest geometry in memory.
+
+        The scanner works silently. The durations of its phases (scanning, building matrix A, reconstructing) and
+        the progress of each iteration are reported to hooks, a ct_hooks object: print_hooks prints them, and a
+        metrics_collector keeps them together with the residuals, the rows processed per second and the peak memory."""
+
+        self.set_up_scanner(beamArray, matrixCache, hooks)
 
         # set the contained image, its width, height, and number of pixels
         self.image = imageObj
         self.imageWidth, self.imageHeight = self.image.size
         self.numberOfPixels = self.imageWidth * self.imageHeight
 
-        # set the beam array at an angle of 0 degrees to the circumcircle of the image; that is, place the beam array
-        # on the left side of the circumcircle
-        self.beamArray = beamArray
-        self.beamArray.set_central_angle(0)
-
         # set a pixel grid object, which helps in deciding which pixels are hit by each beam
         self.pixelGrid = pixel_grid(self.imageWidth, self.imageHeight)
 
         # pixel densities of the original image
         self.pixelDensityArr = self.to_pixel_densities(self.image, doConvertToGrayscale)
 
+    def set_up_scanner(self, beamArray, matrixCache=None, hooks=None):
+        """Sets up the parts of the scanner which do not depend on the scanned image: the hooks, the beam array, the
+        cache of matrices A and the settings of the scan."""
+
+        # hooks which receive the progress of the scanner
+        self.hooks = hooks if hooks is not None else silentHooks
+
+        # set the beam array at an angle of 0 degrees to the circumcircle of the image; that is, place the beam array
+        # on the left side of the circumcircle
+        self.beamArray = beamArray
+        self.beamArray.set_central_angle(0)
+
         # matrices A and B are used for computing the reconstructed image
-        # matrix A contains information on which pixels are struck by each beam
+        # matrix A contains information on which pixels are struck by each beam, and is stored either as a full
+        # array or as a sparse matrix (see CAT_Scanner.scan)
         # matrix B tells how much of each beam is absorbed as it passes through the image
         self.matrixA = array([])
         self.matrixB = array([])
 
+        # matrices A which were already built, so that scanning again with the same setup skips building them
+        self.matrixCache = matrixCache if matrixCache is not None else system_matrix_cache(maxMatricesInMemory=1)
+
+        # how the coefficients of matrix A are computed from the beams, and the type they are stored as, which is
+        # also the precision of the iterative reconstructions (see CAT_Scanner.scan)
+        self.projectionModel = "center_line"
+        self.dtype = float64
+
         # flag which is set to true once the image is already scanned
         self.isScanned = False
 
@@ -57,89 +93,398 @@ class CAT_Scanner:
 
     def to_pixel_densities(self, imageObj, doConvertToGrayscale):
         """Converts an image to a grayscale image and returns an array consisting of pixel densities ranging from 0
-        (white) to 10 (black)."""
-
-        funcGrayscale = lambda r, g, b: ceil(0.2989 * r + 0.5870 * g + 0.1140 * b)
-        funcScaleTo10 = lambda colorInt: 10 - 10 * colorInt / 255
-
-        pixelRGBArr = array(imageObj)
-        pixelDensityFlat = []
-
-        r = 0
-        red, green, blue = 0, 0, 0
-        for colorPart in nditer(pixelRGBArr):
-            color = int(colorPart)
-            r += 1
-            if r == 1:
-                red = color
-            elif r == 2:
-                green = color
-            elif r == 3:
-                blue = color
-                r = 0
-                if doConvertToGrayscale:
-                    pixelDensity = funcScaleTo10(funcGrayscale(red, green, blue))
-                else:
-                    pixelDensity = funcScaleTo10(red)
-                pixelDensityFlat.append(pixelDensity)
-
-        pixelDensityArr = array(pixelDensityFlat).reshape((self.imageHeight, self.imageWidth))
-        return pixelDensityArr
-
-    def scan(self, numberOfDirections):
+        (white) to 10 (black).
+
+        Grayscale, RGB and 16-bit images are read as they are, with 16-bit values scaled to the same range; images
+        with an alpha channel are laid over a white background first. If doConvertToGrayscale is False, only the
+        red channel of a color image is used. Any other image mode is converted to RGBA beforehand."""
+
+        if imageObj.mode not in ["1", "L", "LA", "RGB", "RGBA", "I", "I;16", "I;16B", "I;16L"]:
+            imageObj = imageObj.convert("RGBA")
+
+        pixelArr = asarray(imageObj)
+
+        # largest value of a channel, which corresponds to white; 32-bit integer images are assumed to hold 16-bit
+        # values unless all of their values fit in 8 bits
+        if pixelArr.dtype == bool:
+            maxValue = 1
+        elif pixelArr.dtype == uint8 or (imageObj.mode == "I" and pixelArr.max() <= 255):
+            maxValue = 255
+        else:
+            maxValue = 65535
+
+        # lay an image with an alpha (transparency) channel over a white background
+        if pixelArr.ndim == 3 and pixelArr.shape[2] in [2, 4]:
+            alpha = pixelArr[:, :, -1:] / maxValue
+            pixelArr = pixelArr[:, :, :-1]*alpha + maxValue*(1 - alpha)
+
+        if pixelArr.ndim == 2:
+            colorValues = pixelArr.astype(float64)
+        elif pixelArr.shape[2] == 1 or not doConvertToGrayscale:
+            colorValues = pixelArr[:, :, 0].astype(float64)
+        else:
+            colorValues = einsum("ijk,k->ij", pixelArr, array([0.2989, 0.5870, 0.1140]))
+
+            # 8-bit grayscale values are whole numbers
+            if maxValue == 255:
+                ceil(colorValues, out=colorValues)
+
+        # scale from white (0) to black (10) in place
+        pixelDensityArr = colorValues
+        pixelDensityArr *= -10 / maxValue
+        pixelDensityArr += 10
+        return pixelDensityArr.reshape((self.imageHeight, self.imageWidth))
+
+    def density_vector(self):
+        """Returns the pixel densities of the image as a flat array, which is the vector X of the scan."""
+        return self.pixelDensityArr.flatten()
+
+    def project_densities(self):
+        """Returns the sinogram of the scan, that is, matrix A times the pixel densities of the image."""
+        return self.matrixA @ self.density_vector()
+
+    def scan(self, numberOfDirections, matrixFormat: str = "dense", numberOfWorkers: int = None,
+             projectionModel: str = "center_line", acquisition=None, dtype=float64):
         """Rotate the beam array around the image in a selected number of directions spaced evenly across the
-        circumcircle of the image."""
+        circumcircle of the image.
+
+        matrixFormat is "dense" (a full array), "sparse" (a sparse_matrix) or "operator" (a projection_operator which
+        never stores matrix A; only for the "sirt", "sart" and "fbp" methods). Dense and sparse matrices are kept in
+        matrixCache, and numberOfWorkers processes build a matrix which is not there yet (see system_matrix).
+
+        projectionModel is "center_line" or "strip" (see pixel_grid.trace_beams), acquisition is an optional
+        acquisition_simulator which adds noise to the measurements B, and dtype (float64 or float32) is the type of
+        matrix A and the precision of the iterative reconstructions."""
+
+        if projectionModel not in projectionModels:
+            raise Exception(f"Expected projectionModel to be one of {projectionModels}; received '{projectionModel}'.")
+
+        dtype = matrix_type(dtype)
 
         time1 = time()
+        self.hooks.phase_started("scan", numberOfDirections=numberOfDirections, matrixFormat=matrixFormat,
+                                 projectionModel=projectionModel, dtype=numpy.dtype(dtype).name)
         scanningAngles = linspace(0, 360, numberOfDirections+1)[:-1]
-        submatricesA = []
-        for scanAngle in scanningAngles:
-            self.beamArray.set_central_angle(scanAngle)
-            submatrixA = self.pixelGrid.coefficient_array_center_line(self.beamArray)
-            submatricesA.append(submatrixA)
-
-        self.matrixA = vstack(tuple(submatricesA))
-        vectorX = self.pixelDensityArr.flatten()
-        self.vectorB = matmul(self.matrixA, vectorX)
+        self.projectionModel = projectionModel
+        self.dtype = dtype
+
+        # matrix A only depends on the scan geometry, so it is taken from the cache whenever it was built before;
+        # a projection operator stores nothing and is simply created again
+        self.hooks.phase_started("system_matrix")
+        if matrixFormat == "operator":
+            self.matrixA = system_matrix(self.pixelGrid, self.beamArray, scanningAngles, matrixFormat,
+                                         projectionModel=projectionModel)
+        else:
+            geometryKey = system_matrix_cache.geometry_key(self.imageWidth, self.imageHeight, self.beamArray,
+                                                           numberOfDirections, matrixFormat, projectionModel, dtype)
+            buildMatrix = lambda: compact_system_matrix(self.pixelGrid, self.beamArray, scanningAngles,
+                                                        matrixFormat, numberOfWorkers, projectionModel, dtype)
+            self.matrixA = self.matrixCache.get_or_build(geometryKey, buildMatrix)
         time2 = time()
+        self.hooks.phase_finished("system_matrix", time2 - time1, rows=self.matrixA.shape[0])
+
+        self.hooks.phase_started("forward_projection")
+        self.vectorB = self.project_densities()
+        if acquisition is not None:
+            acquisition.simulate(self.vectorB, self.beamArray.numberOfBeams, out=self.vectorB)
+        self.numberOfDirections = numberOfDirections
+        self.scanningAngles = scanningAngles
+        time3 = time()
+        self.hooks.phase_finished("forward_projection", time3 - time2)
+
+        self.hooks.phase_finished("scan", time3 - time1, numberOfDirections=numberOfDirections,
+                                  matrixFormat=matrixFormat, projectionModel=projectionModel,
+                                  dtype=numpy.dtype(dtype).name)
+        self.isScanned = True
+
+    def save_scan(self, storage):
+        """Saves the scan (the sinogram B, the scanning angles, the pixel densities, the projection model and, unless
+        it is a projection_operator, matrix A) in a ct_storage, so that it can be loaded later with
+        CAT_Scanner.load_scan."""
 
-        timeTaken = round(time2 - time1, 3)
-        print(f"Image successfully scanned in {timeTaken} s. \n")
+        if not self.isScanned:
+            raise Exception("Image has not yet been scanned; call CAT_Scanner.scan(n) to scan the image")
+
+        storage.save_array("vectorB", self.vectorB)
+        storage.save_array("scanningAngles", self.scanningAngles)
+        storage.save_array("pixelDensities", self.pixelDensityArr)
+        storage.save_array("projectionModel", array(self.projectionModel))
+        if isinstance(self.matrixA, sparse_matrix):
+            storage.save_sparse("matrixA", self.matrixA)
+        elif not isinstance(self.matrixA, projection_operator):
+            storage.save_array("matrixA", self.matrixA)
+
+    def load_scan(self, storage):
+        """Loads a scan saved with CAT_Scanner.save_scan from a ct_storage, with the same image size and beam array.
+        The sinogram and matrix A are memory-mapped rather than read into memory, so the reconstruction only reads
+        the parts of them it needs from the disk. A scan saved without matrix A uses a projection_operator."""
+
+        scanningAngles = asarray(storage.load_array("scanningAngles"))
+        projectionModel = str(storage.load_array("projectionModel")) if storage.has_array("projectionModel") \
+            else "center_line"
+        if storage.has_sparse("matrixA"):
+            matrixA = storage.load_sparse("matrixA")
+        elif storage.has_array("matrixA"):
+            matrixA = storage.load_array("matrixA")
+        else:
+            matrixA = system_matrix(self.pixelGrid, self.beamArray, scanningAngles, "operator",
+                                    projectionModel=projectionModel)
+
+        numberOfEquations = len(scanningAngles) * self.beamArray.numberOfBeams
+        if matrixA.shape != (numberOfEquations, self.numberOfPixels):
+            raise Exception(f"Expected the saved matrix A to have size {numberOfEquations} x {self.numberOfPixels}; "
+                            f"received {matrixA.shape[0]} x {matrixA.shape[1]}.")
+
+        self.matrixA = matrixA
+        self.vectorB = storage.load_array("vectorB")
+        self.pixelDensityArr = asarray(storage.load_array("pixelDensities"))
+        self.scanningAngles = scanningAngles
+        self.numberOfDirections = len(scanningAngles)
+        self.projectionModel = projectionModel
+        self.dtype = float64
+        if isinstance(matrixA, sparse_matrix):
+            self.dtype = float32 if matrixA.data.dtype == float32 else float64
+        elif not isinstance(matrixA, projection_operator):
+            self.dtype = float32 if matrixA.dtype == float32 else float64
         self.isScanned = True
 
+    def scan_views(self, numberOfDirections):
+        """Rotate the beam array around the image like CAT_Scanner.scan, but yield the measurements one direction
+        (view) at a time as pairs (scanning angle, measured value of each beam) instead of building the whole scan at
+        once. This simulates an acquisition whose views arrive while it is still going on."""
+
+        for scanAngle in linspace(0, 360, numberOfDirections+1)[:-1]:
+            submatrixA = self.pixelGrid.coefficient_sparse_array(self.beamArray, scanAngle, self.projectionModel)
+            yield scanAngle, submatrixA @ self.density_vector()
+
+    def reconstruct_stream(self, views, viewsPerBatch: int = 10, sweepsPerBatch: int = 1, relaxation: float = 1.0):
+        """Reconstruct the image while its views arrive from views, an iterable of pairs (scanning angle, measured
+        value of each beam) such as CAT_Scanner.scan_views. After every batch of viewsPerBatch views (and after the
+        last view), the reconstruction is refined with SART sweeps over all views received so far (see
+        streaming_reconstructor) and a grayscale preview of the image is yielded.
+
+        The last image yielded is the reconstruction from all views, and its pixel densities are kept in
+        streamedDensities."""
+
+        reconstructor = streaming_reconstructor(self.numberOfPixels, relaxation)
+        batches = []
+
+        def refine():
+            # refine the reconstruction with the views received so far, and report it as one iteration
+            time3 = time()
+            rowsProcessed = sweepsPerBatch * reconstructor.numberOfViews * self.beamArray.numberOfBeams
+            densities = reconstructor.update(sweepsPerBatch)
+            batches.append(reconstructor.numberOfViews)
+            self.hooks.iteration_finished("stream", len(batches), None, time() - time3, rowsProcessed)
+            return Image.fromarray(self.to_color_values(densities))
+
+        time1 = time()
+        self.hooks.phase_started("stream")
+        for scanAngle, viewB in views:
+            submatrixA = self.pixelGrid.coefficient_sparse_array(self.beamArray, scanAngle, self.projectionModel)
+            reconstructor.add_view(submatrixA, viewB)
+
+            if reconstructor.numberOfNewViews == viewsPerBatch:
+                yield refine()
+
+        if reconstructor.numberOfNewViews > 0:
+            yield refine()
+
+        self.streamedDensities = reconstructor.currentX
+        time2 = time()
+
+        self.hooks.phase_finished("stream", time2 - time1, views=reconstructor.numberOfViews)
+
     def to_color_values(self, arrayObj):
         """Translates an array of pixel densities into an array of equivalent RGB colors, ranging from white (0) to
-        black (10)."""
-        funcToGrayscaleValue = lambda x: ceil(255*(10-x) / 10)
-        funcToColorRGB = lambda g: [g, g, g]
+        black (10). Densities outside this range are shown as white or black."""
 
-        colorValuesFlat = []
-        for x in nditer(arrayObj):
-            colorValue = funcToColorRGB(funcToGrayscaleValue(x))
-            colorValuesFlat.append(colorValue)
-        colorValues = array(colorValuesFlat, uint8).reshape((self.imageHeight, self.imageWidth, 3))
+        grayscaleValues = ceil(255*(10 - asarray(arrayObj, float64)) / 10)
+        grayscaleValues = clip(grayscaleValues, 0, 255, out=grayscaleValues).astype(uint8)
+        grayscaleValues = grayscaleValues.reshape((self.imageHeight, self.imageWidth, 1))
+        colorValues = repeat(grayscaleValues, 3, axis=2)
 
         return colorValues
 
-    def reconstruct_image(self, iterations):
-        """Reconstruct a grayscale version of the scanned image by using an iterative projection algorithm specified
-        a number of iterations.
+    def reconstruct_densities(self, iterations: int = None, method="kaczmarz", numberOfBlocks: int = None,
+                              relaxation: float = 1.0, convergenceMonitor=None, storage=None,
+                              ordering: str = "natural", constraints=None, initialX=None, seed: int = None):
+        """Reconstruct the pixel densities of the scanned image by using an iterative projection algorithm specified
+        a number of iterations, and return them as a flat array.
+
+        method is "kaczmarz", "sirt", "sart" (with numberOfBlocks blocks of directions), "fbp" (no iterations), the
+        name of a solver in linearSolvers or a solver function itself. relaxation (0 to 2) scales each update,
+        ordering and seed set the order of the rows (see row_ordering), constraints are density_constraints and
+        initialX is a warm start. A convergenceMonitor may stop the iterations early, and a ct_storage keeps a
+        checkpoint after each iteration from which an interrupted reconstruction resumes.
+
+        NOTE:  The "kaczmarz" method may take a while to execute especially with images of size 30 x 30 pixels or
+        larger."""
+
+        if not self.isScanned:
+            raise Exception("Image has not yet been scanned; call CAT_Scanner.scan(n) to scan the image")
 
-        NOTE:  This step may take a while to execute especially with images of size 30 x 30 pixels or larger."""
+        # a solver given as a function or by its name in linearSolvers, or one of the methods of the scanner; the
+        # name of the method is used for its checkpoints and reported to the hooks
+        solver, methodName = None, method
+        if callable(method):
+            solver, methodName = method, getattr(method, "__name__", "solver")
+        elif method in linearSolvers:
+            solver = linearSolvers[method]
+        elif method not in ["kaczmarz", "sirt", "sart", "fbp"]:
+            raise Exception(f"Expected method to be one of {['kaczmarz', 'sirt', 'sart', 'fbp'] + list(linearSolvers)} "
+                            f"or a solver function; received '{method}'.")
+
+        if solver is not None and constraints is not None:
+            raise Exception(f"The '{methodName}' solver cannot be used with constraints; use the 'kaczmarz', 'sirt' "
+                            f"or 'sart' methods.")
+
+        if iterations is None and method != "fbp":
+            raise Exception(f"Expected a number of iterations for the '{methodName}' method.")
+
+        if method == "kaczmarz" and isinstance(self.matrixA, projection_operator):
+            raise Exception("The 'kaczmarz' method needs the rows of matrix A; scan the image with a 'dense' or "
+                            "'sparse' matrixFormat, or use the 'sirt' or 'sart' methods.")
+
+        # start from zero densities; when vectorB holds the sinograms of several images as its columns, the
+        # densities of each image are reconstructed in the matching column of X
+        initialVectorX = zeros((self.numberOfPixels,) + self.vectorB.shape[1:], self.dtype)
+        if initialX is not None:
+            initialVectorX = array(initialX, self.dtype).reshape(initialVectorX.shape)
+
+        # resume from the last checkpoint of the same reconstruction (the same sinogram, method and settings), and
+        # save a checkpoint after each iteration
+        iterationCallback = None
+        if storage is not None and method != "fbp":
+            fingerprint = ct_storage.fingerprint(methodName, asarray(self.vectorB), self.scanningAngles,
+                                                 self.projectionModel, numpy.dtype(self.dtype).name, numberOfBlocks,
+                                                 relaxation, ordering, seed, initialVectorX)
+            checkpointX, iterationsDone = storage.load_checkpoint(methodName, fingerprint)
+            if checkpointX is not None and checkpointX.shape == initialVectorX.shape:
+                self.hooks.message(f"Resuming the reconstruction after iteration # {iterationsDone}")
+                initialVectorX = checkpointX
+                iterations = max(iterations - iterationsDone, 0)
+            else:
+                iterationsDone = 0
+            iterationCallback = lambda p, currentX: storage.save_checkpoint(currentX, iterationsDone + p,
+                                                                                 methodName, fingerprint)
+
+        time1 = time()
+        self.hooks.phase_started("reconstruct", method=methodName)
+        if solver is not None:
+            vectorApproxX = solver(initialVectorX, self.matrixA, self.vectorB, iterations, convergenceMonitor,
+                                   iterationCallback, self.hooks)
+        elif method == "fbp":
+            sinograms = self.vectorB.reshape((self.numberOfDirections, self.beamArray.numberOfBeams, -1))
+            vectorApproxX = column_stack([filtered_back_projection(sinograms[:, :, k], self.pixelGrid,
+                                                                   self.beamArray, self.scanningAngles)
+                                          for k in range(sinograms.shape[2])]).reshape(initialVectorX.shape)
+        elif method == "kaczmarz":
+            rowOrder = row_ordering(self.scanningAngles, self.beamArray.numberOfBeams, ordering, seed)
+            vectorApproxX = projection_iterates(initialVectorX, self.kaczmarz_projections(), self.vectorB, iterations,
+                                                False, convergenceMonitor, iterationCallback, rowOrder, relaxation,
+                                                constraints, self.hooks)
+        else:
+            rowBlocks = None
+            if method == "sart":
+                rowBlocks = view_blocks(self.numberOfDirections, self.beamArray.numberOfBeams,
+                                        numberOfBlocks or self.numberOfDirections, ordering, seed)
+            vectorApproxX = simultaneous_iterates(initialVectorX, self.matrixA, self.vectorB, iterations, rowBlocks,
+                                                  relaxation, convergenceMonitor, iterationCallback, constraints,
+                                                  self.hooks)
+        time2 = time()
+
+        self.hooks.phase_finished("reconstruct", time2 - time1, method=methodName)
+
+        if storage is not None:
+            storage.save_array("reconstructedDensities", vectorApproxX)
+            storage.remove_checkpoint(methodName)
+
+        return vectorApproxX
+
+    def kaczmarz_projections(self):
+        """Returns matrix A packed in a projection_set for the "kaczmarz" method. It is packed once per matrix A and
+        reused by later reconstructions."""
+
+        if getattr(self, "projectionSetSource", None) is not self.matrixA:
+            self.projectionSet = projection_set(self.matrixA, self.dtype)
+            self.projectionSetSource = self.matrixA
+        return self.projectionSet
+
+    def reconstruct_pyramid(self, iterations: int, refinementIterations: int = 2, downsamplingFactors=(4, 2),
+                            method="sart", numberOfBlocks: int = None, relaxation: float = 1.0,
+                            ordering: str = "natural", constraints=None, seed: int = None):
+        """Reconstruct the pixel densities of the scanned image from coarse to fine resolution, and return them as a
+        flat array.
+
+        The image is first reconstructed with a number of iterations on a grid whose pixels are downsampled by the
+        first of downsamplingFactors in each direction (1/4 of the resolution by default), from the same sinogram.
+        The result is upsampled to warm-start the next, finer grid (1/2 of the resolution), and so on, until only a
+        few refinementIterations are done at full resolution. Coarse grids have far fewer pixels, so most of the work
+        is done where it is cheap.
+
+        See CAT_Scanner.reconstruct_densities for the iterative methods and the other parameters; the matrices A of
+        the coarse grids are built as sparse matrices (or projection operators, if the image was scanned with one)
+        and are not kept in the cache."""
 
         if not self.isScanned:
             raise Exception("Image has not yet been scanned; call CAT_Scanner.scan(n) to scan the image")
 
-        initialVectorX = array([0.0]*self.numberOfPixels)
-        vectorOriginalX = self.pixelDensityArr.flatten()
+        if method == "fbp":
+            raise Exception("Expected an iterative method; the 'fbp' method cannot be warm-started.")
+        methodName = getattr(method, "__name__", method)
+
+        matrixFormat = "operator" if isinstance(self.matrixA, projection_operator) else "sparse"
 
         time1 = time()
-        vectorApproxX = projection_iterates(initialVectorX, self.matrixA, self.vectorB, iterations, False)
+        self.hooks.phase_started("pyramid", method=methodName)
+        levelX, levelGrid = None, None
+        for factor in downsamplingFactors:
+            # a copy of the scanner which sees the same scan through a coarser pixel grid
+            coarseScanner = copy(self)
+            coarseScanner.pixelGrid = self.pixelGrid.downsampled(factor)
+            coarseScanner.imageWidth = coarseScanner.pixelGrid.imageWidth
+            coarseScanner.imageHeight = coarseScanner.pixelGrid.imageHeight
+            coarseScanner.numberOfPixels = coarseScanner.pixelGrid.numberOfPixels
+            time3 = time()
+            self.hooks.phase_started("system_matrix", downsamplingFactor=factor)
+            coarseScanner.matrixA = system_matrix(coarseScanner.pixelGrid, self.beamArray, self.scanningAngles,
+                                                  matrixFormat, projectionModel=self.projectionModel,
+                                                  dtype=self.dtype)
+            self.hooks.phase_finished("system_matrix", time() - time3, downsamplingFactor=factor)
+
+            coarseConstraints = None
+            if constraints is not None:
+                coarseConstraints = copy(constraints)
+                coarseConstraints.imageWidth = coarseScanner.imageWidth
+                coarseConstraints.imageHeight = coarseScanner.imageHeight
+
+            if levelX is not None:
+                levelX = upsample_densities(levelX, levelGrid, coarseScanner.pixelGrid)
+            levelX = coarseScanner.reconstruct_densities(iterations, method, numberOfBlocks, relaxation,
+                                                         ordering=ordering, constraints=coarseConstraints,
+                                                         initialX=levelX, seed=seed)
+            levelGrid = coarseScanner.pixelGrid
+
+        if levelX is not None:
+            levelX = upsample_densities(levelX, levelGrid, self.pixelGrid)
+        vectorApproxX = self.reconstruct_densities(refinementIterations, method, numberOfBlocks, relaxation,
+                                                   ordering=ordering, constraints=constraints, initialX=levelX,
+                                                   seed=seed)
         time2 = time()
 
-        timeTaken = round(time2 - time1, 3)
-        print(f"Image reconstructed in {timeTaken} s \n")
+        self.hooks.phase_finished("pyramid", time2 - time1, method=methodName)
+
+        return vectorApproxX
+
+    def reconstruct_image(self, iterations: int = None, method="kaczmarz", numberOfBlocks: int = None,
+                          relaxation: float = 1.0, convergenceMonitor=None, storage=None, ordering: str = "natural",
+                          constraints=None, seed: int = None):
+        """Reconstruct a grayscale version of the scanned image by using an iterative projection algorithm specified
+        a number of iterations. See CAT_Scanner.reconstruct_densities for the available methods."""
 
+        vectorApproxX = self.reconstruct_densities(iterations, method, numberOfBlocks, relaxation, convergenceMonitor,
+                                                   storage, ordering, constraints, seed=seed)
         colorsRGBX = self.to_color_values(vectorApproxX)
         reconstructedImage = Image.fromarray(colorsRGBX)
 
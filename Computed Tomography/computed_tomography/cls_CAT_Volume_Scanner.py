@@ -0,0 +1,166 @@
+from computed_tomography.cls_CAT_Scanner import *
+from numpy import arange, array_split, empty, ndarray
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+import os
+
+# the scanner whose matrix A is used for reconstructing slices, set once in each worker process
+workerReconstruction = {}
+
+def set_worker_reconstruction(scanner):
+    """Keeps a copy of a scanner (without its volume) in a worker process, so that matrix A is sent to each worker
+    only once."""
+    workerReconstruction["scanner"] = scanner
+
+def worker_reconstruct_slices(slicesB, iterations, method, numberOfBlocks, relaxation, ordering, constraints, seed):
+    """Reconstructs the pixel densities of the slices whose sinograms are the columns of slicesB, with the scanner
+    kept in a worker process."""
+
+    scanner = workerReconstruction["scanner"]
+    scanner.vectorB = slicesB
+    return scanner.reconstruct_densities(iterations, method, numberOfBlocks, relaxation, ordering=ordering,
+                                         constraints=constraints, seed=seed)
+
+
+class CAT_Volume_Scanner(CAT_Scanner):
+    """A class which simulates Computed Tomography (CT) scans on a volume, that is, a stack of slices of the same size
+    which are scanned with one constructed beam array. Matrix A is built once and used for every slice, and the slices
+    are reconstructed in groups, optionally by several worker processes at once.
+
+    If a ct_storage is given, the volume, its sinograms and its reconstruction are kept in memory-mapped files, so a
+    volume larger than the available memory can be scanned and reconstructed one group of slices at a time."""
+
+    def __init__(self, volume, beamArray, doConvertToGrayscale: bool = True, matrixCache=None, storage=None,
+                 hooks=None):
+        """Initialize a CAT Scanner on a volume with a beam array. The volume is either a 3 dimensional array of pixel
+        densities from 0 (white) to 10 (black) with one slice per layer, or the path of a directory of slice images
+        which are stacked in the order of their file names. See CAT_Scanner for the matrixCache and the hooks."""
+
+        self.set_up_scanner(beamArray, matrixCache, hooks)
+        self.storage = storage
+        if isinstance(volume, str):
+            self.pixelDensityArr = self.read_slice_images(volume, doConvertToGrayscale)
+        else:
+            self.pixelDensityArr = volume if isinstance(volume, ndarray) else asarray(volume, float64)
+            if self.pixelDensityArr.ndim != 3:
+                raise Exception(f"Expected the volume to be a 3 dimensional array; received an array with "
+                                f"{self.pixelDensityArr.ndim} dimensions.")
+
+        # set the size of each slice, and the number of slices
+        self.image = None
+        self.numberOfSlices, self.imageHeight, self.imageWidth = self.pixelDensityArr.shape
+        self.numberOfPixels = self.imageWidth * self.imageHeight
+
+        # set the pixel grid shared by all slices
+        self.pixelGrid = pixel_grid(self.imageWidth, self.imageHeight)
+
+    def read_slice_images(self, directory, doConvertToGrayscale):
+        """Reads the images in a directory as the slices of a volume, in the order of their file names, and returns
+        their pixel densities as a 3 dimensional array (kept in the storage if there is one)."""
+
+        fileNames = sorted(fileName for fileName in os.listdir(directory)
+                           if os.path.isfile(os.path.join(directory, fileName)))
+        if len(fileNames) == 0:
+            raise Exception(f"Expected at least one slice image in {directory}.")
+
+        volume = None
+        for k, fileName in enumerate(fileNames):
+            imageObj = Image.open(os.path.join(directory, fileName))
+            if volume is None:
+                self.imageWidth, self.imageHeight = imageObj.size
+                volumeShape = (len(fileNames), self.imageHeight, self.imageWidth)
+                volume = empty(volumeShape) if self.storage is None else \
+                    self.storage.create_array("pixelDensities", volumeShape)
+            elif imageObj.size != (self.imageWidth, self.imageHeight):
+                raise Exception(f"Expected all slices to have the size {self.imageWidth} x {self.imageHeight}; "
+                                f"received {fileName} of size {imageObj.size[0]} x {imageObj.size[1]}.")
+            volume[k] = self.to_pixel_densities(imageObj, doConvertToGrayscale)
+
+        return volume
+
+    def density_vector(self):
+        """Returns the pixel densities of the volume as a two-dimensional array with one flattened slice in each
+        column, which is the matrix X of the scan."""
+        return self.pixelDensityArr.reshape((self.numberOfSlices, self.numberOfPixels)).T
+
+    def slice_groups(self, slicesPerGroup):
+        """Splits the slice numbers of the volume into groups of at most slicesPerGroup slices."""
+        return array_split(arange(self.numberOfSlices), -(-self.numberOfSlices // slicesPerGroup))
+
+    def project_densities(self, slicesPerGroup: int = 16):
+        """Returns the sinograms of all slices as the columns of one array, projecting a group of slices at a time.
+        If the scanner has a storage, the sinograms are written to it as "vectorB"."""
+
+        sinogramShape = (self.matrixA.shape[0], self.numberOfSlices)
+        vectorB = empty(sinogramShape) if self.storage is None else self.storage.create_array("vectorB", sinogramShape)
+
+        matrixX = self.density_vector()
+        for sliceNumbers in self.slice_groups(slicesPerGroup):
+            vectorB[:, sliceNumbers] = self.matrixA @ asarray(matrixX[:, sliceNumbers], float64)
+
+        return vectorB
+
+    def reconstruct_volume(self, iterations: int = None, method="sart", numberOfBlocks: int = None,
+                           relaxation: float = 1.0, numberOfWorkers: int = None, slicesPerGroup: int = 16,
+                           ordering: str = "natural", constraints=None, seed: int = None):
+        """Reconstruct the pixel densities of all slices and return them as a 3 dimensional array with one slice per
+        layer; if the scanner has a storage, the array is memory-mapped and saved in it as "reconstructedVolume". See
+        CAT_Scanner.reconstruct_densities for the available methods.
+
+        The slices are reconstructed in groups of slicesPerGroup, whose sinograms are solved together with the same
+        matrix A. If numberOfWorkers is given, that many worker processes reconstruct the groups at once, each of
+        them receiving matrix A only once.
+
+        The number of slices reconstructed per second is kept in slicesPerSecond."""
+
+        if not self.isScanned:
+            raise Exception("Volume has not yet been scanned; call CAT_Volume_Scanner.scan(n) to scan the volume")
+
+        volumeShape = (self.numberOfSlices, self.imageHeight, self.imageWidth)
+        volume = empty(volumeShape) if self.storage is None else \
+            self.storage.create_array("reconstructedVolume", volumeShape)
+        sliceGroups = self.slice_groups(slicesPerGroup)
+
+        self.hooks.phase_started("volume", slices=self.numberOfSlices, workers=numberOfWorkers or 1)
+        time1 = time()
+        if numberOfWorkers is None or numberOfWorkers <= 1:
+            vectorB = self.vectorB
+            for sliceNumbers in sliceGroups:
+                self.vectorB = asarray(vectorB[:, sliceNumbers])
+                slicesX = self.reconstruct_densities(iterations, method, numberOfBlocks, relaxation, ordering=ordering,
+                                                     constraints=constraints, seed=seed)
+                volume[sliceNumbers] = slicesX.T.reshape((len(sliceNumbers), self.imageHeight, self.imageWidth))
+            self.vectorB = vectorB
+        else:
+            # the workers only need matrix A and the scan geometry, not the volume itself
+            workerScanner = copy(self)
+            workerScanner.pixelDensityArr, workerScanner.vectorB = None, None
+            workerScanner.matrixCache, workerScanner.storage = None, None
+            workerScanner.hooks = silentHooks
+
+            with ProcessPoolExecutor(numberOfWorkers, initializer=set_worker_reconstruction,
+                                     initargs=(workerScanner,)) as executor:
+                futures = [executor.submit(worker_reconstruct_slices, asarray(self.vectorB[:, sliceNumbers]),
+                                           iterations, method, numberOfBlocks, relaxation, ordering, constraints,
+                                           seed)
+                           for sliceNumbers in sliceGroups]
+                for sliceNumbers, future in zip(sliceGroups, futures):
+                    slicesX = future.result()
+                    volume[sliceNumbers] = slicesX.T.reshape((len(sliceNumbers), self.imageHeight, self.imageWidth))
+        time2 = time()
+
+        if self.storage is not None:
+            volume.flush()
+
+        self.slicesPerSecond = self.numberOfSlices / max(time2 - time1, 1e-12)
+        self.hooks.phase_finished("volume", time2 - time1, slices=self.numberOfSlices,
+                                  slicesPerSecond=self.slicesPerSecond)
+
+        return volume
+
+    def slice_image(self, volume, sliceNumber):
+        """Returns a grayscale image of one slice of a volume of pixel densities."""
+        return Image.fromarray(self.to_color_values(volume[sliceNumber]))
+
+    def __repr__(self):
+        return f"CAT_Volume_Scanner of {self.numberOfSlices} slices of size {self.imageWidth} x {self.imageHeight}"
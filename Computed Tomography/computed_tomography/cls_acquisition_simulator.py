@@ -0,0 +1,127 @@
+from numpy import asarray, empty, exp, log, maximum, arange, ceil, float64
+from numpy.random import default_rng
+
+
+class acquisition_simulator:
+    """A class which turns the exact measurements B = A*X of a scan (the line integrals of the pixel densities along
+    every beam) into the noisy measurements a real scanner would make:
+     - Beer-Lambert law -- each beam starts with incidentPhotons photons, of which exp(-attenuationPerDensity * b)
+     reach the detector, where b is its line integral (a density of 1 over a length of 1 pixel attenuates a beam by
+     attenuationPerDensity)
+     - detector blur -- the photons of each beam are spread over the neighbouring beams of the same direction with a
+     Gaussian of standard deviation detectorBlur (in beams), as by crosstalk between detector cells
+     - Poisson noise -- the number of photons counted for each beam is drawn from a Poisson distribution around the
+     number expected
+    The counts are turned back into line integrals with the logarithm, as a scanner would; beams where no photon is
+    counted are treated as if one photon was.
+
+    The random numbers come from a generator with the given seed, so that a simulation can be repeated exactly (see
+    reset). Many images (the columns of B) are simulated at a time, imagesPerBatch of them in each batch, and the
+    noise of each image does not depend on how the images are split into batches."""
+
+    def __init__(self, incidentPhotons: float = 1e5, attenuationPerDensity: float = 0.01, detectorBlur: float = 0.0,
+                 seed: int = None, imagesPerBatch: int = 64):
+        """Create an acquisition simulator with a number of photons per beam, the attenuation of a density of 1 per
+        pixel, the standard deviation of the detector blur in beams, a seed and a number of images per batch."""
+
+        if incidentPhotons <= 0:
+            raise Exception(f"Expected incidentPhotons to be positive; received {incidentPhotons}.")
+        if detectorBlur < 0:
+            raise Exception(f"Expected detectorBlur to be at least 0; received {detectorBlur}.")
+
+        self.incidentPhotons = incidentPhotons
+        self.attenuationPerDensity = attenuationPerDensity
+        self.detectorBlur = detectorBlur
+        self.seed = seed
+        self.imagesPerBatch = imagesPerBatch
+        self.reset()
+
+    def reset(self):
+        """Start the random numbers over from the seed, so that the next simulation repeats the first one."""
+        self.randomGenerator = default_rng(self.seed)
+
+    def blur_kernel(self):
+        """Returns the weights of the Gaussian detector blur for the beams from -r to r places away, which add up to
+        1, or None if there is no blur."""
+
+        if self.detectorBlur == 0:
+            return None
+        radius = max(1, int(ceil(3 * self.detectorBlur)))
+        kernel = exp(-0.5 * (arange(-radius, radius + 1) / self.detectorBlur)**2)
+        return kernel / kernel.sum()
+
+    def blur(self, intensities, numberOfBeams):
+        """Returns the intensities (with one row per beam, ordered by direction, then by beam, and one column per
+        image) spread over the neighbouring beams of each direction by the detector blur. Beams at the edges of the
+        detector are blurred as if the edge beams went on beyond them."""
+
+        kernel = self.blur_kernel()
+        if kernel is None:
+            return intensities
+
+        radius = kernel.shape[0] // 2
+        views = intensities.reshape((-1, numberOfBeams, intensities.shape[1]))
+
+        # pad each direction with copies of its edge beams, then add up the shifted beams with their weights
+        padded = empty((views.shape[0], numberOfBeams + 2*radius, views.shape[2]))
+        padded[:, radius:radius + numberOfBeams] = views
+        padded[:, :radius] = views[:, :1]
+        padded[:, radius + numberOfBeams:] = views[:, -1:]
+
+        blurred = kernel[0] * padded[:, :numberOfBeams]
+        for k in range(1, kernel.shape[0]):
+            blurred += kernel[k] * padded[:, k:k + numberOfBeams]
+
+        return blurred.reshape(intensities.shape)
+
+    def expected_counts(self, vectorB, numberOfBeams):
+        """Returns the number of photons expected to be counted for each beam, given the exact measurements B (a flat
+        array, or an array with one column per image)."""
+
+        matrixB = asarray(vectorB, float64)
+        matrixB = matrixB.reshape((matrixB.shape[0], -1))
+        intensities = self.incidentPhotons * exp(-self.attenuationPerDensity * matrixB)
+        return self.blur(intensities, numberOfBeams).reshape(asarray(vectorB).shape)
+
+    def simulate(self, vectorB, numberOfBeams, out=None):
+        """Returns the noisy measurements of a scan with the given number of beams per direction, given its exact
+        measurements B (a flat array, or an array with one column per image). The result has the same shape as B and
+        is written to out if it is given, which may be B itself (such as a memory-mapped array of a ct_storage)."""
+
+        if vectorB.shape[0] % numberOfBeams != 0:
+            raise Exception(f"Expected the number of measurements ({vectorB.shape[0]}) to be a multiple of the "
+                            f"number of beams ({numberOfBeams}).")
+
+        if out is None:
+            out = empty(vectorB.shape)
+        matrixB, matrixOut = vectorB.reshape((vectorB.shape[0], -1)), out.reshape((out.shape[0], -1))
+
+        for start in range(0, matrixB.shape[1], self.imagesPerBatch):
+            columns = slice(start, start + self.imagesPerBatch)
+            expectedCounts = self.expected_counts(matrixB[:, columns], numberOfBeams)
+
+            # the counts are drawn one image after another, so that batching does not change them
+            counts = self.randomGenerator.poisson(expectedCounts.T).T
+            matrixOut[:, columns] = log(self.incidentPhotons / maximum(counts, 1)) / self.attenuationPerDensity
+
+        return out
+
+    def simulate_images(self, matrixA, matrixX, numberOfBeams, out=None):
+        """Returns the noisy measurements of scanning many images with the same matrix A, given their pixel densities
+        as the columns of matrixX; each batch of images is projected with one matrix-matrix product and then
+        simulated. The result has one column per image and is written to out if it is given."""
+
+        if out is None:
+            out = empty((matrixA.shape[0], matrixX.shape[1]))
+
+        for start in range(0, matrixX.shape[1], self.imagesPerBatch):
+            columns = slice(start, start + self.imagesPerBatch)
+            out[:, columns] = self.simulate(matrixA @ asarray(matrixX[:, columns], float64), numberOfBeams)
+
+        return out
+
+    def __repr__(self):
+        return f"acquisition_simulator(incidentPhotons={self.incidentPhotons}," \
+               f"                      attenuationPerDensity={self.attenuationPerDensity}," \
+               f"                      detectorBlur={self.detectorBlur}," \
+               f"                      seed={self.seed}"
@@ -1,6 +1,9 @@
 class beam:
     """A class representing the X-ray beams that are used to scan the object"""
 
+    # beams only ever hold these attributes, which keeps each of them small
+    __slots__ = ["centralAngle", "translationAngle", "inclination", "beamWidth", "overallAngle", "overallInclination"]
+
     def __init__(self, centralAngle, translationAngle, inclination, beamWidth):
         """Create an X-ray beam with a specified width (1 unit = 1 pixel) and angular position and whose point of
         origin is positioned along the circumcircle of the image.
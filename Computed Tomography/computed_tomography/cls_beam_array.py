@@ -0,0 +1,71 @@
+from computed_tomography.cls_beam import *
+from numpy import asarray, allclose
+
+class beam_array:
+    """A class representing the beams of a beam array as arrays rather than as separate objects: the translation
+    angle and the inclination of every beam relative to the beam array are kept in two arrays, so rotating the beam
+    array or finding the overall angles of all of its beams takes a few array operations however many beams it has.
+
+    The beam objects themselves (see beam) are only created if someone asks for them through beamArray. This is the
+    base class of beam_array_parallel and beam_array_fan_mode, which set the angles of their beams."""
+
+    def __init__(self, translationAngles, inclinationAngles, beamWidth, centralAngle = 0):
+        """Create a beam array from the translation angle and the inclination of each of its beams, and a beam width
+        (1 unit = 1 pixel) shared by all beams."""
+
+        self.translationAngles = asarray(translationAngles, float)
+        self.inclinationAngles = asarray(inclinationAngles, float)
+        self.numberOfBeams = self.translationAngles.shape[0]
+        self.beamWidth = beamWidth
+
+        # the beam objects, created on first use
+        self.beamObjects = None
+        self.set_central_angle(centralAngle)
+
+    @property
+    def beamArray(self):
+        """The list of beam objects in the beam array, which are created the first time they are needed and are
+        rotated together with the beam array from then on."""
+
+        if self.beamObjects is None:
+            self.beamObjects = [beam(self.centralAngle, T, I, self.beamWidth)
+                                for T, I in zip(self.translationAngles.tolist(), self.inclinationAngles.tolist())]
+        return self.beamObjects
+
+    def set_central_angle(self, newAngle):
+        """Change the central angle of the beam array; corresponds to rotating the beam array"""
+
+        self.centralAngle = newAngle
+        self.overallAngles, self.overallInclinations = self.beam_angles(newAngle)
+
+        # beam objects which were already handed out follow the beam array
+        if self.beamObjects is not None:
+            for bm in self.beamObjects:
+                bm.set_central_angle(newAngle)
+
+    def beam_angles(self, centralAngle=None):
+        """Returns two arrays with the overall angle and the overall inclination of every beam in the array when the
+        beam array is placed at the given central angle (by default, its current central angle). Unlike
+        set_central_angle, this does not rotate the beam array itself."""
+
+        if centralAngle is None:
+            centralAngle = self.centralAngle
+        return centralAngle + self.translationAngles, centralAngle + self.inclinationAngles
+
+    def is_mirror_symmetric(self):
+        """Returns True if the beam array is its own mirror image across its center line, with its beams in reverse
+        order, as the evenly spread parallel and fan mode beam arrays are."""
+
+        return allclose(self.translationAngles[::-1], -self.translationAngles, rtol=0, atol=1e-9) and \
+            allclose(self.inclinationAngles[::-1], -self.inclinationAngles, rtol=0, atol=1e-9)
+
+    def __getstate__(self):
+        # beam objects are not worth sending to worker processes; they are created again there if needed
+        state = self.__dict__.copy()
+        state["beamObjects"] = None
+        return state
+
+    def __repr__(self):
+        return f"beam_array(numberOfBeams={self.numberOfBeams}," \
+               f"           beamWidth={self.beamWidth}," \
+               f"           centralAngle={self.centralAngle}"
@@ -1,7 +1,7 @@
-from computed_tomography.cls_beam import *
-from numpy import linspace
+from computed_tomography.cls_beam_array import *
+from numpy import linspace, zeros
 
-class beam_array_parallel:
+class beam_array_parallel(beam_array):
     """A class representing a beam array that is rotated around an image in a parallel-mode CT scan.
     Here, beams are aimed in the same direction but originate from different points along the circumcircle of the
     image to be scanned."""
@@ -10,24 +10,14 @@ class beam_array_parallel:
         """Create a parallel-mode beam array given a number of beams, the spread angle for the beams' positions, and
         a beam width (1 unit = 1 pixel)."""
 
-        self.numberOfBeams = numberOfBeams
-        self.beamWidth = beamWidth
-        self.centralAngle = centralAngle
         self.spreadAngle = spreadAngle
-        translationAngles = linspace(-spreadAngle/2, spreadAngle/2, numberOfBeams)
-
-        # create the beam objects
-        self.beamArray = [beam(centralAngle, T, 0, beamWidth) for T in translationAngles]
 
-    def set_central_angle(self, newAngle):
-        """Change the central angle of the beam array; corresponds to rotating the beam array"""
-
-        self.centralAngle = newAngle
-        for bm in self.beamArray:
-            bm.set_central_angle(newAngle)
+        # every beam is aimed parallel to the beam array, from its own point along the circumcircle
+        translationAngles = linspace(-spreadAngle/2, spreadAngle/2, numberOfBeams)
+        super().__init__(translationAngles, zeros(numberOfBeams), beamWidth, centralAngle)
 
     def __repr__(self):
         return f"beam_array_parallel(numberOfBeams={self.numberOfBeams}," \
                f"                    spreadAngle={self.spreadAngle}," \
                f"                    beamWidth={self.beamWidth}," \
-               f"                    centralAngle={self.centralAngle}"
\ No newline at end of file
+               f"                    centralAngle={self.centralAngle}"
@@ -0,0 +1,72 @@
+from numpy import asarray
+from numpy.linalg import norm
+
+
+class convergence_monitor:
+    """A class which keeps track of how an iterative reconstruction progresses and decides when to stop it.
+
+    After each iteration, the solver reports the residual norm ||A*X - B||. The monitor records it (together with the
+    error ||X - reference|| if a reference image is given) and tells the solver to stop early once:
+     - the relative residual ||A*X - B|| / ||B|| falls to the tolerance or below, or
+     - the relative residual improves by less than stagnationTolerance for a number of iterations in a row given by
+     patience, since more iterations would hardly change the output."""
+
+    def __init__(self, tolerance: float = None, stagnationTolerance: float = None, patience: int = 1,
+                 referenceX=None):
+        """Create a convergence monitor with optional stopping criteria and an optional reference vector of pixel
+        densities (such as the flattened densities of the original image)."""
+
+        self.tolerance = tolerance
+        self.stagnationTolerance = stagnationTolerance
+        self.patience = patience
+        self.referenceX = None if referenceX is None else asarray(referenceX, float)
+        self.reset()
+
+    def reset(self):
+        """Forget the history of any previous reconstruction."""
+
+        self.residualNorms = []
+        self.relativeResiduals = []
+        self.errorNorms = []
+        self.iterationTimes = []
+        self.stoppingReason = None
+        self.stagnantIterations = 0
+
+    @property
+    def iterations(self):
+        """The number of iterations recorded so far."""
+        return len(self.residualNorms)
+
+    def update(self, currentX, residualNorm, normB, iterationTime: float = 0.0):
+        """Records one iteration and returns True if the solver should stop."""
+
+        relativeResidual = residualNorm / normB if normB > 0 else residualNorm
+        self.residualNorms.append(float(residualNorm))
+        self.relativeResiduals.append(float(relativeResidual))
+        self.iterationTimes.append(iterationTime)
+
+        if self.referenceX is not None:
+            self.errorNorms.append(float(norm(currentX - self.referenceX.reshape(currentX.shape))))
+
+        if self.tolerance is not None and relativeResidual <= self.tolerance:
+            self.stoppingReason = "tolerance"
+            return True
+
+        if self.stagnationTolerance is not None and len(self.relativeResiduals) >= 2:
+            improvement = self.relativeResiduals[-2] - relativeResidual
+            if improvement < self.stagnationTolerance * self.relativeResiduals[-2]:
+                self.stagnantIterations += 1
+            else:
+                self.stagnantIterations = 0
+
+            if self.stagnantIterations >= self.patience:
+                self.stoppingReason = "stagnation"
+                return True
+
+        return False
+
+    def __repr__(self):
+        lastResidual = self.relativeResiduals[-1] if self.relativeResiduals else None
+        return f"convergence_monitor(iterations={self.iterations}," \
+               f"                    relativeResidual={lastResidual}," \
+               f"                    stoppingReason={self.stoppingReason}"
@@ -0,0 +1,156 @@
+import sys
+import tracemalloc
+
+# the peak memory of the whole process is only available on systems with the resource module (not on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class ct_hooks:
+    """A class defining the hooks through which the scanners and solvers of this package report their progress. Every
+    hook does nothing, so the package is silent by default; subclasses override the hooks they need and are passed to
+    a CAT_Scanner (or to a solver) as its hooks:
+     - phase_started(phase, **details) -- a phase of work starts, such as "scan", "system_matrix", "reconstruct",
+     "kaczmarz" or "sart"
+     - phase_finished(phase, seconds, **details) -- a phase of work ends after a number of seconds
+     - iteration_finished(phase, iteration, iterations, seconds, rowsProcessed, residualNorm) -- an iteration of a
+     solver ends after a number of seconds, having projected on rowsProcessed rows of matrix A; the residual
+     ||A*X - B|| is only computed (otherwise it is None) if the hooks set wantsResiduals to True or the solver has a
+     convergence_monitor
+     - message(text) -- any other event worth telling, such as resuming from a checkpoint"""
+
+    wantsResiduals = False
+
+    def phase_started(self, phase, **details):
+        pass
+
+    def phase_finished(self, phase, seconds, **details):
+        pass
+
+    def iteration_finished(self, phase, iteration, iterations, seconds, rowsProcessed, residualNorm=None):
+        pass
+
+    def message(self, text):
+        pass
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+# the hooks used when none are given
+silentHooks = ct_hooks()
+
+
+class print_hooks(ct_hooks):
+    """Hooks which print the progress of every phase and iteration, as the package used to do by default."""
+
+    def phase_started(self, phase, **details):
+        print(f"Beginning {phase}")
+
+    def phase_finished(self, phase, seconds, **details):
+        print(f"Finished {phase} in {round(seconds, 3)} s \n")
+
+    def iteration_finished(self, phase, iteration, iterations, seconds, rowsProcessed, residualNorm=None):
+        print(f"Finished Iteration # {iteration} out of {iterations} in {round(seconds, 3)} s")
+
+    def message(self, text):
+        print(text)
+
+
+class metrics_collector(ct_hooks):
+    """Hooks which collect the durations of all phases, the residuals and the number of rows processed per second of
+    every iteration, and the peak memory used, so that they can be inspected or exported (for example as JSON
+    through metrics_collector.to_dict) after a run.
+
+    If doComputeResiduals is True, the solvers compute ||A*X - B|| after each iteration, which costs one extra matrix
+    product per iteration. If doTrackMemory is True, the peak memory allocated through Python (including numpy
+    arrays) during each outermost phase is traced with tracemalloc, which slows the run down somewhat. Tracing which
+    this collector started is stopped again when the outermost phase finishes."""
+
+    def __init__(self, doComputeResiduals: bool = True, doTrackMemory: bool = False):
+        """Create an empty metrics collector."""
+
+        self.wantsResiduals = doComputeResiduals
+        self.doTrackMemory = doTrackMemory
+        self.phases = []
+        self.iterations = []
+        self.messages = []
+        self.peakTracedMemory = 0
+        self.openPhases = 0
+
+        # whether this collector started tracemalloc, and so has to stop it again
+        self.isTracingOwned = False
+
+    def phase_started(self, phase, **details):
+        if self.openPhases == 0 and self.doTrackMemory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.isTracingOwned = True
+            tracemalloc.reset_peak()
+        self.openPhases += 1
+
+    def phase_finished(self, phase, seconds, **details):
+        self.openPhases -= 1
+        self.phases.append(dict(details, phase=phase, seconds=seconds))
+        if self.openPhases == 0 and self.doTrackMemory:
+            self.peakTracedMemory = max(self.peakTracedMemory, tracemalloc.get_traced_memory()[1])
+            self.stop_tracing()
+
+    def iteration_finished(self, phase, iteration, iterations, seconds, rowsProcessed, residualNorm=None):
+        self.iterations.append({"phase": phase, "iteration": iteration, "seconds": seconds,
+                                "rowsProcessed": rowsProcessed,
+                                "rowsPerSecond": rowsProcessed / seconds if seconds > 0 else None,
+                                "residualNorm": None if residualNorm is None else float(residualNorm)})
+
+    def message(self, text):
+        self.messages.append(text)
+
+    @property
+    def peakResidentMemory(self):
+        """The largest amount of memory (in bytes) the whole process has held so far, or None if it is unknown."""
+
+        if resource is None:
+            return None
+        # macOS reports bytes, while Linux reports kilobytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def phase_durations(self):
+        """Returns the total number of seconds spent in each phase."""
+
+        durations = {}
+        for record in self.phases:
+            durations[record["phase"]] = durations.get(record["phase"], 0.0) + record["seconds"]
+        return durations
+
+    def residual_norms(self, phase=None):
+        """Returns the residual norms of the iterations (of one phase, if given) which computed them."""
+        return [record["residualNorm"] for record in self.iterations
+                if record["residualNorm"] is not None and phase in [None, record["phase"]]]
+
+    def to_dict(self):
+        """Returns everything collected as a dictionary of plain values."""
+
+        return {"phaseDurations": self.phase_durations(), "phases": self.phases, "iterations": self.iterations,
+                "messages": self.messages, "peakTracedMemory": self.peakTracedMemory if self.doTrackMemory else None,
+                "peakResidentMemory": self.peakResidentMemory}
+
+    def stop_tracing(self):
+        """Stops tracemalloc if this collector started it."""
+
+        if self.isTracingOwned:
+            tracemalloc.stop()
+            self.isTracingOwned = False
+
+    def clear(self):
+        """Forget everything collected so far, and stop the tracing of memory started by this collector."""
+
+        self.phases, self.iterations, self.messages = [], [], []
+        self.peakTracedMemory = 0
+        self.openPhases = 0
+        self.stop_tracing()
+
+    def __repr__(self):
+        return f"metrics_collector(phases={len(self.phases)}," \
+               f"                  iterations={len(self.iterations)}"
@@ -0,0 +1,165 @@
+from computed_tomography.cls_sparse_matrix import *
+from numpy import asarray, ascontiguousarray, ndarray, load, savez, memmap, array, float64
+from numpy.lib.format import open_memmap
+from hashlib import sha1
+import mmap
+import os
+
+
+class ct_storage:
+    """A class which keeps the arrays of a CT job (sinograms, matrices A, reconstructed images and volumes) in a
+    directory as .npy files, which are opened as memory-mapped arrays. Only the parts of a memory-mapped array that
+    are used are read from the disk, so jobs larger than the available memory can still run.
+
+    It also keeps checkpoints of iterative reconstructions, so that a reconstruction which was interrupted can be
+    resumed from the last saved iterate."""
+
+    def __init__(self, directory: str):
+        """Create a storage in a directory, which is created if it does not exist yet."""
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def array_path(self, name):
+        """Returns the path of the .npy file of an array with a given name."""
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def has_array(self, name):
+        """Returns True if an array with the given name was saved."""
+        return os.path.exists(self.array_path(name))
+
+    def create_array(self, name, shape, dtype=float64):
+        """Creates a memory-mapped array of zeros with the given name, shape and type, which can be filled in parts
+        and is written to the disk as it is filled.
+
+        The array is created in a new file which then takes the place of any earlier array with the same name, so
+        arrays still memory-mapped from the earlier file keep their values (rather than being cut off by the new
+        file)."""
+
+        # write to a temporary file first and then rename it, since opening the existing file with mode "w+" would
+        # truncate it under any array mapped from it
+        temporaryPath = self.array_path(name) + ".tmp"
+        mappedArray = open_memmap(temporaryPath, mode="w+", dtype=dtype, shape=tuple(shape))
+        os.replace(temporaryPath, self.array_path(name))
+        return self.tag_mapped_array(name, mappedArray)
+
+    def file_identity(self, name):
+        """Returns the device and inode of the file of the array with the given name, which tell whether two arrays
+        are mapped from the same file even after it was renamed."""
+
+        fileStatus = os.stat(self.array_path(name))
+        return fileStatus.st_dev, fileStatus.st_ino
+
+    def tag_mapped_array(self, name, mappedArray):
+        """Marks a memory-mapped array with the identity of the file of the array with the given name, which it was
+        just mapped from, and returns it."""
+
+        mappedArray.fileIdentity = self.file_identity(name)
+        return mappedArray
+
+    def is_mapped_from(self, name, arrayObj):
+        """Returns True if arrayObj is the whole memory-mapped array of the current file of the array with the given
+        name, as returned by create_array, save_array or load_array (with mode "r" or "r+"), so that its values are
+        the ones in the file."""
+
+        if not (isinstance(arrayObj, memmap) and isinstance(arrayObj.base, mmap.mmap) and self.has_array(name)):
+            return False
+        # a copy-on-write array ("c") may hold values which were never written to the file
+        if arrayObj.mode == "c":
+            return False
+        return getattr(arrayObj, "fileIdentity", None) == self.file_identity(name)
+
+    def save_array(self, name, arrayObj):
+        """Saves an array with the given name and returns it as a memory-mapped array. An array which is already
+        memory-mapped from the file of that name is only flushed to the disk, and is returned as it is."""
+
+        if self.is_mapped_from(name, arrayObj):
+            if arrayObj.mode != "r":
+                arrayObj.flush()
+            return arrayObj
+
+        arrayObj = asarray(arrayObj)
+        mappedArray = self.create_array(name, arrayObj.shape, arrayObj.dtype)
+        mappedArray[...] = arrayObj
+        mappedArray.flush()
+        return mappedArray
+
+    def load_array(self, name, mode: str = "r"):
+        """Returns the array with the given name as a memory-mapped array, opened as read-only ("r"), as writable
+        ("r+") or as a writable copy which leaves the file unchanged ("c")."""
+
+        if not self.has_array(name):
+            raise Exception(f"No array named '{name}' was saved in {self.directory}.")
+        return self.tag_mapped_array(name, load(self.array_path(name), mmap_mode=mode))
+
+    def save_sparse(self, name, matrix):
+        """Saves a sparse_matrix with the given name, one .npy file for each of its CSR arrays."""
+
+        self.save_array(f"{name}.data", matrix.data)
+        self.save_array(f"{name}.indices", matrix.indices)
+        self.save_array(f"{name}.indptr", matrix.indptr)
+        self.save_array(f"{name}.shape", asarray(matrix.shape))
+
+    def has_sparse(self, name):
+        """Returns True if a sparse_matrix with the given name was saved."""
+        return self.has_array(f"{name}.shape")
+
+    def load_sparse(self, name, mode: str = "r"):
+        """Returns the sparse_matrix with the given name, whose CSR arrays are memory-mapped."""
+
+        shape = tuple(int(n) for n in self.load_array(f"{name}.shape"))
+        return sparse_matrix(self.load_array(f"{name}.data", mode), self.load_array(f"{name}.indices", mode),
+                             self.load_array(f"{name}.indptr", mode), shape)
+
+    def checkpoint_path(self, name):
+        """Returns the path of the checkpoint file with a given name."""
+        return os.path.join(self.directory, f"{name}.checkpoint.npz")
+
+    @staticmethod
+    def fingerprint(*values):
+        """Returns a hash (a hexadecimal string) of arrays and plain values, such as the sinogram and the settings of
+        a reconstruction, which tells whether a checkpoint belongs to it."""
+
+        hashObj = sha1()
+        for value in values:
+            if isinstance(value, ndarray):
+                value = ascontiguousarray(value)
+                hashObj.update(repr((value.dtype.str, value.shape)).encode())
+                hashObj.update(value.data)
+            else:
+                hashObj.update(repr(value).encode())
+            hashObj.update(b"|")
+        return hashObj.hexdigest()
+
+    def save_checkpoint(self, currentX, iteration, name: str = "reconstruction", fingerprint: str = None):
+        """Saves the iterate X reached after a number of iterations of a reconstruction, together with the
+        fingerprint of the reconstruction (see ct_storage.fingerprint) if it is given."""
+
+        # write to a temporary file first, so that a crash while saving never destroys the previous checkpoint
+        temporaryPath = self.checkpoint_path(name) + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            savez(file, currentX=currentX, iteration=iteration, fingerprint=array(fingerprint or ""))
+        os.replace(temporaryPath, self.checkpoint_path(name))
+
+    def load_checkpoint(self, name: str = "reconstruction", fingerprint: str = None):
+        """Returns the last saved iterate X and the number of iterations it was reached after, or (None, 0) if no
+        checkpoint was saved. If a fingerprint is given, a checkpoint saved with another fingerprint (that is, by
+        another reconstruction) is ignored as well."""
+
+        if not os.path.exists(self.checkpoint_path(name)):
+            return None, 0
+
+        with load(self.checkpoint_path(name)) as arrays:
+            savedFingerprint = str(arrays["fingerprint"]) if "fingerprint" in arrays else ""
+            if fingerprint is not None and savedFingerprint != fingerprint:
+                return None, 0
+            return arrays["currentX"], int(arrays["iteration"])
+
+    def remove_checkpoint(self, name: str = "reconstruction"):
+        """Removes the checkpoint with the given name, if there is one."""
+
+        if os.path.exists(self.checkpoint_path(name)):
+            os.remove(self.checkpoint_path(name))
+
+    def __repr__(self):
+        return f"ct_storage(directory={self.directory}"
@@ -0,0 +1,82 @@
+from numpy import zeros_like, sqrt, clip
+
+
+class density_constraints:
+    """A class which keeps the pixel densities of an iterative reconstruction physically meaningful and less noisy.
+
+    After each iteration, the solver hands it the current pixel densities X, which are then changed in place:
+     - Tikhonov regularization shrinks X towards 0 as the minimizer of ||X - X'||^2 + tikhonovWeight * ||X'||^2 does
+     - total variation (TV) regularization takes tvSteps small steps which lower the sum of the lengths of the
+     gradients of the image, which smooths noise while keeping edges sharp
+     - X is projected on the box [lowerBound, upperBound], since densities are never negative nor darker than black
+
+    Solvers which update X several times per iteration (such as SART) may also project X on the box after each
+    update, which is cheap, and regularize it only once per iteration.
+
+    By default, only the box constraint is applied, with the range 0 (white) to 10 (black) of
+    CAT_Scanner.to_pixel_densities."""
+
+    def __init__(self, imageWidth, imageHeight, lowerBound: float = 0.0, upperBound: float = 10.0,
+                 tikhonovWeight: float = 0.0, tvWeight: float = 0.0, tvSteps: int = 5):
+        """Create constraints for images of a given width and height. A bound of None leaves that side unbounded."""
+
+        self.imageWidth = imageWidth
+        self.imageHeight = imageHeight
+        self.lowerBound = lowerBound
+        self.upperBound = upperBound
+        self.tikhonovWeight = tikhonovWeight
+        self.tvWeight = tvWeight
+        self.tvSteps = tvSteps
+
+    def total_variation_gradient(self, imageX):
+        """Returns the gradient of the (smoothed) total variation of images given as an array of shape height x width
+        x number of images."""
+
+        # differences with the next pixel to the right and below, which are 0 at the right and bottom edges
+        differencesX = zeros_like(imageX)
+        differencesY = zeros_like(imageX)
+        differencesX[:, :-1] = imageX[:, 1:] - imageX[:, :-1]
+        differencesY[:-1] = imageX[1:] - imageX[:-1]
+
+        # unit gradients, smoothed so that flat regions do not divide by 0
+        gradientLengths = sqrt(differencesX**2 + differencesY**2 + 1e-4)
+        differencesX /= gradientLengths
+        differencesY /= gradientLengths
+
+        # the gradient of the total variation is minus the divergence of the unit gradients
+        divergence = differencesX.copy()
+        divergence[:, 1:] -= differencesX[:, :-1]
+        divergence += differencesY
+        divergence[1:] -= differencesY[:-1]
+        return -divergence
+
+    def regularize(self, currentX):
+        """Applies the Tikhonov and total variation regularization to the pixel densities X in place, where X is a
+        flat array or an array with one flattened image in each column."""
+
+        if self.tikhonovWeight > 0:
+            currentX /= 1 + self.tikhonovWeight
+
+        if self.tvWeight > 0:
+            imageX = currentX.reshape((self.imageHeight, self.imageWidth, -1))
+            for s in range(self.tvSteps):
+                imageX -= self.tvWeight * self.total_variation_gradient(imageX)
+
+        return currentX
+
+    def project_box(self, currentX):
+        """Projects the pixel densities X on the box [lowerBound, upperBound] in place."""
+
+        if self.lowerBound is not None or self.upperBound is not None:
+            clip(currentX, self.lowerBound, self.upperBound, out=currentX)
+
+        return currentX
+
+    def apply(self, currentX):
+        """Applies the regularization and then the box constraint to the pixel densities X in place."""
+        return self.project_box(self.regularize(currentX))
+
+    def __repr__(self):
+        return f"density_constraints(bounds=[{self.lowerBound}, {self.upperBound}]," \
+               f"                    tikhonovWeight={self.tikhonovWeight}," \
+               f"                    tvWeight={self.tvWeight}"
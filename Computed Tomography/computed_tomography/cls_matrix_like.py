@@ -0,0 +1,13 @@
+class matrix_like:
+    """A base class for matrices which are not stored as numpy arrays. Subclasses define dot(Y), which returns A @ Y,
+    and transpose_dot(Y), which returns A^T @ Y; the @ operator then works with numpy arrays on either side."""
+
+    # let this class handle the matrix products with numpy arrays on either side of the @ operator
+    __array_ufunc__ = None
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    def __rmatmul__(self, other):
+        # Y @ A is computed as (A^T @ Y^T)^T
+        return self.transpose_dot(other.T).T
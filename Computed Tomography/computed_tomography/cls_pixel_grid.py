@@ -1,18 +1,35 @@
-from math import sqrt, sin, cos, tan, radians, floor
-from numpy import array, vstack
+from math import sqrt, ceil
+from computed_tomography.cls_sparse_matrix import *
+from numpy import asarray, arange, zeros, hstack, repeat, tile, where, clip, isnan, fmin, fmax, minimum, maximum, \
+    errstate, inf, add, int64, sin, cos, radians, floor, rint, ones, concatenate, flatnonzero
+
+# the ways the coefficients of a beam can be computed (see pixel_grid.trace_beams)
+projectionModels = ["center_line", "strip"]
+
+# the number of lines traced across each pixel width of a beam by the "strip" projection model
+stripRaysPerPixel = 4
+
+# how close (in pixels) a line parallel to the grid lines must be to one of them to be treated as lying on it, and
+# how far its two halves are moved to either side of it
+gridLineTolerance = 1e-9
+gridLineShift = 1e-6
 
 class pixel_grid:
     """A class representing the grid lines bounding each pixel in the image and the image itself."""
 
-    def __init__(self, imageWidth:int, imageHeight:int):
+    def __init__(self, imageWidth:int, imageHeight:int, pixelSize:float = 1):
         """Create a pixel grid with a specified width (maximum X-coordinate) and height (maximum Y-coordinate).
 
         The grid's origin (0, 0) is at the top-left corner of the image, and the X and Y directions of the grid
-        go in the left and down directions, respectively."""
+        go in the left and down directions, respectively.
+
+        Each pixel is a square whose sides have length pixelSize in the coordinates of the beams (see
+        pixel_grid.downsampled); the image then covers imageWidth*pixelSize x imageHeight*pixelSize."""
 
         self.imageWidth = imageWidth
         self.imageHeight = imageHeight
         self.numberOfPixels = self.imageWidth * self.imageHeight
+        self.pixelSize = pixelSize
 
         # Here, the origin (0, 0) is at the top-left corner of the image
         # The x-axis goes to the right and the y-axis goes down
@@ -20,9 +37,9 @@ class pixel_grid:
         self.minX, self.minY = 0, 0
         self.maxX, self.maxY = imageWidth, imageHeight
 
-        # center and radius
-        self.centerX, self.centerY = imageWidth/2, imageHeight/2
-        self.minRadius = sqrt(imageWidth**2 + imageHeight**2)/2
+        # center and radius, in the coordinates of the beams
+        self.centerX, self.centerY = imageWidth*pixelSize/2, imageHeight*pixelSize/2
+        self.minRadius = sqrt(imageWidth**2 + imageHeight**2)*pixelSize/2
 
         # setup pixel coordinates
         pixels = []
@@ -36,6 +53,147 @@ class pixel_grid:
         self.pixels = pixels
         self.pixelsList = pixelsList
 
+    def downsampled(self, factor:int):
+        """Returns a coarser pixel grid over the same image, where each pixel covers factor x factor pixels of this
+        grid. The coarse grid keeps the center and radius of this grid, so that every beam follows the same line
+        through both; if the width or height is not a multiple of factor, the last coarse pixels stick out of the
+        image on the right or bottom."""
+
+        coarseGrid = pixel_grid(-(-self.imageWidth // factor), -(-self.imageHeight // factor), self.pixelSize*factor)
+        coarseGrid.centerX, coarseGrid.centerY, coarseGrid.minRadius = self.centerX, self.centerY, self.minRadius
+        return coarseGrid
+
+    def is_centered(self):
+        """Returns True if the center of the grid is the center of its pixels, so that turning or mirroring the grid
+        about its center moves every pixel onto another pixel."""
+        return self.centerX == self.imageWidth*self.pixelSize/2 and self.centerY == self.imageHeight*self.pixelSize/2
+
+    def trace_center_lines(self, overallAngles, overallInclinations, offsets=None):
+        """Traces the center lines of many beams through the image at once, given the overall angle and the overall
+        inclination (in degrees) of each beam. If offsets are given, each line is shifted sideways (to the right of
+        its direction) by its offset from the center line of its beam, in the coordinates of the beams.
+
+        Returns three arrays (beam numbers, pixel numbers, lengths), where each triple tells that the beam with the
+        given beam number (its position in the inputs) passes through the pixel (j, i) with the pixel number
+        j + i*imageWidth along a segment with the given length.
+
+        A line lying on a grid line (or on the edge of the image) belongs to the pixels on both sides of it equally,
+        so it is traced as two lines with half its weight, just to either side of the grid line. This keeps the
+        coefficients of mirrored and rotated beams the mirror images and rotations of each other."""
+
+        overallAngles, overallInclinations = asarray(overallAngles, float), asarray(overallInclinations, float)
+        numberOfBeams = overallAngles.shape[0]
+
+        # First find where each line passes through in the circle centered about the image's center with
+        # a radius equal to half the length of the diagonal of the image, and the direction of each line.
+        # Directions parallel to the grid lines are set exactly, since cos(90) is not exactly 0 in floating point.
+        # Points are measured in pixels, so that the grid lines are at whole numbers.
+        x0 = (self.centerX - self.minRadius*cos(radians(overallAngles))) / self.pixelSize
+        y0 = (self.centerY - self.minRadius*sin(radians(overallAngles))) / self.pixelSize
+        dx, dy = cos(radians(overallInclinations)), sin(radians(overallInclinations))
+        dx[overallInclinations % 180 == 90] = 0.0
+        dy[overallInclinations % 180 == 0] = 0.0
+        if offsets is not None:
+            offsets = asarray(offsets, float) / self.pixelSize
+            x0, y0 = x0 - offsets*dy, y0 + offsets*dx
+
+        # Split each line lying on a grid line into two half lines, one on each side of it. tracedBeams tells which
+        # beam each traced line belongs to, and weights how much of the beam it carries.
+        isOnGridLine = ((dx == 0) & (abs(x0 - rint(x0)) < gridLineTolerance)) | \
+                       ((dy == 0) & (abs(y0 - rint(y0)) < gridLineTolerance))
+        splitBeams = flatnonzero(isOnGridLine)
+        tracedBeams = concatenate((arange(numberOfBeams, dtype=int64), splitBeams))
+        weights = ones(tracedBeams.shape[0])
+        shifts = zeros(tracedBeams.shape[0])
+        if splitBeams.shape[0] > 0:
+            weights[splitBeams], weights[numberOfBeams:] = 0.5, 0.5
+            shifts[splitBeams], shifts[numberOfBeams:] = -gridLineShift, gridLineShift
+            x0, y0, dx, dy = x0[tracedBeams], y0[tracedBeams], dx[tracedBeams], dy[tracedBeams]
+            x0, y0 = x0 - shifts*dy, y0 + shifts*dx
+
+        # Then assign x and y coordinates that describe each line in the grid
+        gridX = arange(self.minX, self.maxX + 1, dtype=float)
+        gridY = arange(self.minY, self.maxY + 1, dtype=float)
+
+        # Each point on a line is (x0 + t*dx, y0 + t*dy); get the values of t where the lines cross the grid lines.
+        # Lines which never cross a set of grid lines get NaN values there.
+        with errstate(divide="ignore", invalid="ignore"):
+            tX = (gridX[None, :] - x0[:, None]) / dx[:, None]
+            tY = (gridY[None, :] - y0[:, None]) / dy[:, None]
+
+        # Next, find the values of t where each line enters and leaves the image. A line parallel to a set of grid
+        # lines stays between them forever if it starts between them, and never enters the image otherwise.
+        isInsideX = (self.minX <= x0) & (x0 <= self.maxX)
+        isInsideY = (self.minY <= y0) & (y0 <= self.maxY)
+        with errstate(invalid="ignore"):
+            tEnterX = where(dx != 0, fmin(tX[:, 0], tX[:, -1]), where(isInsideX, -inf, inf))
+            tLeaveX = where(dx != 0, fmax(tX[:, 0], tX[:, -1]), where(isInsideX, inf, -inf))
+            tEnterY = where(dy != 0, fmin(tY[:, 0], tY[:, -1]), where(isInsideY, -inf, inf))
+            tLeaveY = where(dy != 0, fmax(tY[:, 0], tY[:, -1]), where(isInsideY, inf, -inf))
+        tEnter, tLeave = maximum(tEnterX, tEnterY), minimum(tLeaveX, tLeaveY)
+        crossesImage = tLeave > tEnter
+        tEnter, tLeave = where(crossesImage, tEnter, 0.0), where(crossesImage, tLeave, 0.0)
+
+        # Only keep the crossings within the image, then sort them along each line. Crossings outside the image are
+        # moved to where the line enters or leaves the image, so they only form segments with no length.
+        tCrossings = hstack((tEnter[:, None], tX, tY, tLeave[:, None]))
+        tCrossings = where(isnan(tCrossings), tEnter[:, None], tCrossings)
+        tCrossings = clip(tCrossings, tEnter[:, None], tLeave[:, None])
+        tCrossings.sort(axis=1)
+
+        # Then for each pair of consecutive crossings, the length of the segment between them becomes a
+        # coefficient, and the midpoint of the segment tells which pixel the coefficient belongs to
+        lengths = tCrossings[:, 1:] - tCrossings[:, :-1]
+        tMidpoints = (tCrossings[:, 1:] + tCrossings[:, :-1]) / 2
+        pixelX = floor(x0[:, None] + tMidpoints*dx[:, None]).astype(int64)
+        pixelY = floor(y0[:, None] + tMidpoints*dy[:, None]).astype(int64)
+
+        isSegment = (lengths > 1e-9) & (0 <= pixelX) & (pixelX < self.imageWidth) & \
+                    (0 <= pixelY) & (pixelY < self.imageHeight)
+        lineNumbers = repeat(arange(tracedBeams.shape[0], dtype=int64)[:, None], lengths.shape[1], axis=1)[isSegment]
+
+        return tracedBeams[lineNumbers], (pixelX + pixelY*self.imageWidth)[isSegment], \
+            lengths[isSegment]*weights[lineNumbers]*self.pixelSize
+
+    def trace_strips(self, overallAngles, overallInclinations, beamWidth):
+        """Traces many beams of the given width through the image at once like trace_center_lines, but as strips
+        rather than lines: each beam is covered by evenly spaced parallel lines across its width (stripRaysPerPixel
+        lines per pixel width), and the length of each line within a pixel is weighted by one over the number of
+        lines. The coefficient of a pixel is then (nearly) the area of the strip within the pixel divided by the
+        width of the beam, so pixels which the center line just misses still count towards the beam.
+
+        Returns three arrays (beam numbers, pixel numbers, lengths) in the same form as trace_center_lines; a pixel
+        crossed by several lines of a beam appears once for each of them."""
+
+        overallAngles, overallInclinations = asarray(overallAngles, float), asarray(overallInclinations, float)
+        numberOfBeams = overallAngles.shape[0]
+        raysPerBeam = max(1, ceil(stripRaysPerPixel * beamWidth / self.pixelSize))
+
+        # the lines of each beam are placed at the middles of raysPerBeam equal parts of its width, and are traced
+        # together, with the lines of one beam next to each other
+        offsets = ((arange(raysPerBeam) + 0.5) / raysPerBeam - 0.5) * beamWidth
+        beamNumbers, pixelNumbers, lengths = self.trace_center_lines(repeat(overallAngles, raysPerBeam),
+                                                                     repeat(overallInclinations, raysPerBeam),
+                                                                     tile(offsets, numberOfBeams))
+
+        return beamNumbers // raysPerBeam, pixelNumbers, lengths / raysPerBeam
+
+    def trace_beams(self, beamArrayObj, centralAngle=None, projectionModel: str = "center_line"):
+        """Traces every beam of a beam array (placed at the given central angle, or at its current central angle by
+        default) through the image according to projectionModel, which is either:
+         - "center_line" -- each beam is the line through its middle (see trace_center_lines)
+         - "strip" -- each beam is a strip as wide as its beam width (see trace_strips), which samples the image
+         more evenly when the beams are wide or far apart
+
+        Returns three arrays (beam numbers, pixel numbers, lengths) in the same form as trace_center_lines."""
+
+        if projectionModel not in projectionModels:
+            raise Exception(f"Expected projectionModel to be one of {projectionModels}; received '{projectionModel}'.")
+
+        if projectionModel == "strip":
+            return self.trace_strips(*beamArrayObj.beam_angles(centralAngle), beamArrayObj.beamWidth)
+        return self.trace_center_lines(*beamArrayObj.beam_angles(centralAngle))
+
     def coefficient_list_center_line(self, beamObj):
         """Returns a row array containing information on which pixels on the image are hit by the beam using the
         center line method.
@@ -43,115 +201,44 @@ class pixel_grid:
         Each number in the array may be either 0, that is, the beam does not pass through the pixel or a nonzero
         value up to sqrt(2) ~ 1.414, which tells how long is the segment of the line within the pixel."""
 
+        # if the line does not cross the image, the row is simply the zero row
+        _, pixelNumbers, lengths = self.trace_center_lines([beamObj.overallAngle], [beamObj.overallInclination])
+        coefficientList = zeros(self.numberOfPixels)
+        add.at(coefficientList, pixelNumbers, lengths)
 
-        # First find where the line passes through in the circle centered about the image's center with
-        # a radius equal to half the length of the diagonal of the image
-        x0 = self.centerX - self.minRadius*cos(radians(beamObj.overallAngle))
-        y0 = self.centerY - self.minRadius*sin(radians(beamObj.overallAngle))
-
-        # Then assign x and y coordinates that describe each line in the grid
-        gridX = [float(x) for x in range(self.minX, self.maxX + 1)]
-        gridY = [float(y) for y in range(self.minY, self.maxY + 1)]
-        nIntercepts = len(gridX)
-
-        # Next, get the slope of the line by using the beam's overall inclination, and get all the points where
-        # the line crosses any of the grid lines even those outside the image using the equation of the line
-        i = beamObj.overallInclination
-        isVertical = False
-        if i % 90 != 0:
-            m = tan(radians(i))
-            getY = lambda x: round(y0 + m * (x-x0), 4)
-            getX = lambda y: round(x0 + (y - y0)/m, 4)
-            interceptY = [getY(x) for x in gridX]
-            interceptX = [getX(y) for y in gridY]
-        elif i % 180 == 0:
-            interceptY = [y0]*nIntercepts
-            interceptX = []
-        else:
-            interceptX = [x0]*nIntercepts
-            interceptY = []
-            isVertical = True
-        interceptPointsA = list(zip(gridX, interceptY))
-        interceptPointsB = list(zip(interceptX, gridY))
-
-
-
-        # Next, only keep those intercepts that are within the image, remove any repeated intercepts and
-        # sort the intercepts according to either y-coordinate (if the line is vertical) or x-coordinate
-        # in all other cases
-        interceptPointsA = [(x, y) for x, y in interceptPointsA if self.minY <= y <= self.maxY]
-        interceptPointsB = [(x, y) for x, y in interceptPointsB if self.minX <= x <= self.maxX]
-        interceptPoints = interceptPointsA
-        interceptPoints.extend(interceptPointsB)
-        interceptPoints = list(set(interceptPoints))
-        if isVertical:
-            interceptPoints.sort(key = lambda point: point[1])
-        else:
-            interceptPoints.sort(key = lambda point: point[0])
-
-        # update the number of intercepts remaining
-        nIntercepts = len(interceptPoints)
-
-        # if there are any remaining intercepts, the line crosses the image
-        if nIntercepts != 0:
-
-            # Then for each pair of consecutive intercepts within the image, we take the length of the segment
-            # (or distance) between them, which becomes a coefficient, and use the midpoint of the segment to
-            # assign which pixel as this coefficient.
-            aDistances = []
-            pixelsIntercepted = []
-            x1, y1 = interceptPoints[0]
-            for i in range(0, nIntercepts - 1):
-                x2, y2 = interceptPoints[i + 1]
-                distance = sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-                aDistances.append(distance)
-
-                midpoint = ((x1 + x2)/2, (y1 + y2)/2)
-                pixelIntercepted = (floor(midpoint[0]), floor(midpoint[1]))
-                pixelsIntercepted.append(pixelIntercepted)
-                x1, y1 = x2, y2
-            pixelInterceptedCoefficients = dict(zip(pixelsIntercepted, aDistances))
-
-            # Finally, assemble the coefficient list which becomes a row in the linear system to be solved
-            # during the scan and assemble an array representing the coefficients of each pixel in the grid
-            coefficientList = []
-            coefficientPixels = self.pixels.copy()
-            for i in range(self.imageHeight):
-                for j in range(self.imageWidth):
-                    pixel = (j, i)
-                    if pixel in pixelsIntercepted:
-                        aValue = pixelInterceptedCoefficients[pixel]
-                        coefficientList.append(aValue)
-                        coefficientPixels[i][j] = aValue
-                    else:
-                        coefficientList.append(0.0)
-                        coefficientPixels[i][j] = 0.0
-
-        else:
-            # If there are no remaining intercepts, the line does not cross the image and there are no
-            # intercepts within the image.
-
-            # Therefore, the row is simply the zero row
-
-            coefficientList = []
-            coefficientPixels = self.pixels.copy()
-            for i in range(self.imageHeight):
-                for j in range(self.imageWidth):
-                    coefficientList.append(0.0)
-                    coefficientPixels[i][j] = 0.0
-
-        coefficientList = array(coefficientList)
         return coefficientList
 
-    def coefficient_array_center_line(self, beamArrayObj):
-        """Returns a two-dimensional array where each row, computed through the center line method, is the row of
-        coefficients for each beam in the beam array"""
+    def coefficient_array(self, beamArrayObj, centralAngle=None, projectionModel: str = "center_line"):
+        """Returns a two-dimensional array where each row, computed through the given projection model (see
+        trace_beams), is the row of coefficients for each beam in the beam array (placed at the given central angle,
+        or at its current central angle by default)"""
 
-        coefficientArray = vstack(tuple(self.coefficient_list_center_line(beamObj) for beamObj in
-                                        beamArrayObj.beamArray))
+        beamNumbers, pixelNumbers, lengths = self.trace_beams(beamArrayObj, centralAngle, projectionModel)
+        coefficientArray = zeros((beamArrayObj.numberOfBeams, self.numberOfPixels))
+        add.at(coefficientArray, (beamNumbers, pixelNumbers), lengths)
 
         return coefficientArray
 
+    def coefficient_sparse_array(self, beamArrayObj, centralAngle=None, projectionModel: str = "center_line"):
+        """Returns the same coefficients as coefficient_array as a sparse matrix, which only stores the
+        coefficients of the pixels that are actually hit by each beam in the beam array."""
+
+        beamNumbers, pixelNumbers, lengths = self.trace_beams(beamArrayObj, centralAngle, projectionModel)
+        return sparse_matrix.from_coordinates(beamNumbers, pixelNumbers, lengths,
+                                              (beamArrayObj.numberOfBeams, self.numberOfPixels))
+
+    def coefficient_array_center_line(self, beamArrayObj, centralAngle=None):
+        """Returns a two-dimensional array where each row, computed through the center line method, is the row of
+        coefficients for each beam in the beam array (placed at the given central angle, or at its current central
+        angle by default)"""
+        return self.coefficient_array(beamArrayObj, centralAngle, "center_line")
+
+    def coefficient_sparse_array_center_line(self, beamArrayObj, centralAngle=None):
+        """Returns the same coefficients as coefficient_array_center_line as a sparse matrix, which only stores the
+        coefficients of the pixels that are actually hit by each beam in the beam array."""
+        return self.coefficient_sparse_array(beamArrayObj, centralAngle, "center_line")
+
     def __repr__(self):
         return f"pixel_grid(imageWidth={self.imageWidth}," \
-               f"           imageHeight={self.imageHeight}"
\ No newline at end of file
+               f"           imageHeight={self.imageHeight}," \
+               f"           pixelSize={self.pixelSize}"
\ No newline at end of file
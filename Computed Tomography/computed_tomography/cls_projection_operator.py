@@ -0,0 +1,100 @@
+from computed_tomography.cls_pixel_grid import *
+from computed_tomography.cls_matrix_like import *
+from numpy import array, zeros, bincount, unique, arange, array_equal, result_type, float32, float64
+
+
+class projection_operator(matrix_like):
+    """A class which acts like the matrix A of a CT scan without ever storing it. The coefficients of each direction
+    (view) of the scan are traced through the pixel grid whenever they are needed and thrown away afterwards, so the
+    memory used only grows with the size of the image and of the sinogram.
+
+    Supports the products A @ X (forward projection) and Y @ A (back-projection) like an array or a sparse_matrix.
+    The coefficients are traced and the products are added up in 64-bit floats; the products are returned as 32-bit
+    floats when X (or Y) is made of 32-bit floats."""
+
+    def __init__(self, pixelGrid, beamArray, scanningAngles, projectionModel: str = "center_line"):
+        """Create the projection operator of a scan where the beam array is placed at each of the scanning angles
+        around the pixel grid in turn, whose beams are traced with the given projection model (see
+        pixel_grid.trace_beams)."""
+
+        if projectionModel not in projectionModels:
+            raise Exception(f"Expected projectionModel to be one of {projectionModels}; received '{projectionModel}'.")
+
+        self.pixelGrid = pixelGrid
+        self.beamArray = beamArray
+        self.projectionModel = projectionModel
+        self.scanningAngles = array(scanningAngles, float)
+        self.numberOfBeams = beamArray.numberOfBeams
+        self.shape = (self.scanningAngles.shape[0] * self.numberOfBeams, pixelGrid.numberOfPixels)
+
+    def trace_view(self, scanAngle):
+        """Returns the (beam numbers, pixel numbers, lengths) of the beam array placed at a scanning angle."""
+        return self.pixelGrid.trace_beams(self.beamArray, scanAngle, self.projectionModel)
+
+    def forward_project(self, vectorX):
+        """Returns A * X, the value measured by every beam in every direction for the pixel densities X (or for each
+        column of X)."""
+
+        if vectorX.shape[0] != self.shape[1]:
+            raise Exception(f"Expected an array of {self.shape[1]} pixel densities; received {vectorX.shape[0]}.")
+
+        vectorY = zeros((self.shape[0],) + vectorX.shape[1:], result_type(vectorX, float32))
+        for v, scanAngle in enumerate(self.scanningAngles):
+            beamNumbers, pixelNumbers, lengths = self.trace_view(scanAngle)
+            viewRows = slice(v * self.numberOfBeams, (v + 1) * self.numberOfBeams)
+            if vectorX.ndim == 1:
+                vectorY[viewRows] = bincount(beamNumbers, lengths * vectorX[pixelNumbers], self.numberOfBeams)
+            else:
+                for j in range(vectorX.shape[1]):
+                    vectorY[viewRows, j] = bincount(beamNumbers, lengths * vectorX[pixelNumbers, j],
+                                                    self.numberOfBeams)
+
+        return vectorY
+
+    def back_project(self, vectorY):
+        """Returns A^T * Y, which spreads the value of every beam in every direction back over the pixels it passes
+        through (for Y, or for each column of Y)."""
+
+        if vectorY.shape[0] != self.shape[0]:
+            raise Exception(f"Expected an array of {self.shape[0]} beam values; received {vectorY.shape[0]}.")
+
+        vectorX = zeros((self.shape[1],) + vectorY.shape[1:], float64)
+        for v, scanAngle in enumerate(self.scanningAngles):
+            beamNumbers, pixelNumbers, lengths = self.trace_view(scanAngle)
+            viewY = vectorY[v * self.numberOfBeams: (v + 1) * self.numberOfBeams]
+            if vectorY.ndim == 1:
+                vectorX += bincount(pixelNumbers, lengths * viewY[beamNumbers], self.shape[1])
+            else:
+                for j in range(vectorY.shape[1]):
+                    vectorX[:, j] += bincount(pixelNumbers, lengths * viewY[beamNumbers, j], self.shape[1])
+
+        return vectorX.astype(result_type(vectorY, float32), copy=False)
+
+    def take_rows(self, rowNumbers):
+        """Returns the projection operator of the rows with the given row numbers, which must make up whole
+        directions of the scan (all beams of each direction, in order)."""
+
+        rowNumbers = array(rowNumbers)
+        views = unique(rowNumbers // self.numberOfBeams)
+        expectedRows = (views[:, None] * self.numberOfBeams + arange(self.numberOfBeams)[None, :]).flatten()
+        if not array_equal(rowNumbers, expectedRows):
+            raise Exception("A projection operator can only be split into whole directions of the scan.")
+
+        return projection_operator(self.pixelGrid, self.beamArray, self.scanningAngles[views], self.projectionModel)
+
+    def to_sparse(self):
+        """Returns the matrix A of the operator, stored as a sparse_matrix."""
+
+        return sparse_matrix.vstack([self.pixelGrid.coefficient_sparse_array(self.beamArray, scanAngle,
+                                                                             self.projectionModel)
+                                     for scanAngle in self.scanningAngles])
+
+    # the products with the @ operator (see matrix_like)
+    dot = forward_project
+    transpose_dot = back_project
+
+    def __repr__(self):
+        return f"projection_operator(pixelGrid={self.pixelGrid}," \
+               f"                    beamArray={self.beamArray}," \
+               f"                    numberOfDirections={self.scanningAngles.shape[0]}," \
+               f"                    projectionModel={self.projectionModel}"
@@ -0,0 +1,90 @@
+from computed_tomography.cls_sparse_matrix import *
+from computed_tomography.cls_matrix_like import *
+from numpy import asarray, zeros, where, dot, take, multiply, add, diff, float32, float64
+
+
+class projection_set(matrix_like):
+    """A class holding the hyperplanes dot(A, X) = b of a linear system in the compact form used by the Kaczmarz
+    method (see projection_iterates): for each row A of the matrix (each ray of a scan), only the columns of its
+    nonzero entries, their values (the weights) and the inverse 1 / dot(A, A) of its squared norm are kept.
+
+    The weights may be stored as 32-bit floats to halve their memory, while the pixel densities and the squared norms
+    are kept in 64-bit floats. Projecting on a row then only reads and writes the few pixels hit by its ray, through
+    buffers which are allocated once, instead of creating a full-length vector for every row."""
+
+    def __init__(self, matrixA, dtype=float64):
+        """Create a projection set from a matrix A given as an array or a sparse_matrix, with weights of the given
+        type (float64 or float32)."""
+
+        if dtype not in [float64, float32]:
+            raise Exception(f"Expected dtype to be float64 or float32; received {dtype}.")
+
+        if not isinstance(matrixA, sparse_matrix):
+            matrixA = sparse_matrix.from_dense(asarray(matrixA))
+
+        # the squared norms are computed from the weights in full precision before they are (optionally) rounded
+        rowNormsSquared = matrixA.row_norms_squared()
+        self.inverseNormsSquared = where(rowNormsSquared > 0, 1 / where(rowNormsSquared > 0, rowNormsSquared, 1), 0.0)
+
+        self.matrix = sparse_matrix(matrixA.data.astype(dtype), matrixA.indices, matrixA.indptr, matrixA.shape)
+        self.shape = self.matrix.shape
+        self.maxRowLength = int(diff(self.matrix.indptr).max()) if self.shape[0] > 0 else 0
+        self.rowViews = None
+
+    @property
+    def nnz(self):
+        """The number of stored weights."""
+        return self.matrix.nnz
+
+    def rows(self):
+        """Returns, for each row, a tuple (columns, weights, inverse squared norm) whose arrays are views into the
+        stored arrays. They are created once and reused by every sweep."""
+
+        if self.rowViews is None:
+            self.rowViews = [self.matrix.row(k) + (self.inverseNormsSquared[k],) for k in range(self.shape[0])]
+        return self.rowViews
+
+    def sweep(self, currentX, vectorB, rowOrder, relaxation: float = 1.0):
+        """Projects X in place on the hyperplane of each row given in rowOrder in turn, moving it by relaxation times
+        the distance to each hyperplane. X is a flat array of 64-bit floats, or an array with one column for each
+        system; rows with a norm of 0 are expected to be left out of rowOrder."""
+
+        rows = self.rows()
+
+        # buffers for the entries of X hit by a ray and for their update, reused by every row; weights of another
+        # type than X are copied into a buffer of the type of X, so that no product has to cast them
+        bufferShape = (self.maxRowLength,) + currentX.shape[1:]
+        gathered, update = zeros(bufferShape, currentX.dtype), zeros(bufferShape, currentX.dtype)
+        isCastWeights = self.matrix.data.dtype != currentX.dtype
+        castWeights = zeros(self.maxRowLength, currentX.dtype)
+        isMatrixX = currentX.ndim == 2
+
+        for k in rowOrder:
+            columns, weights, inverseNormSquared = rows[k]
+            rowLength = columns.shape[0]
+            rowGathered, rowUpdate = gathered[:rowLength], update[:rowLength]
+            if isCastWeights:
+                castWeights[:rowLength] = weights
+                weights = castWeights[:rowLength]
+
+            # same as projection_hyperplane, restricted to the pixels hit by the ray
+            take(currentX, columns, axis=0, out=rowGathered)
+            projectionFactor = relaxation * (vectorB[k] - dot(weights, rowGathered)) * inverseNormSquared
+            multiply(weights[:, None] if isMatrixX else weights, projectionFactor, out=rowUpdate)
+            add(rowGathered, rowUpdate, out=rowGathered)
+            currentX[columns] = rowGathered
+
+        return currentX
+
+    def dot(self, other):
+        """Returns A @ other, computed with the matrix the set was made from."""
+        return self.matrix @ other
+
+    def transpose_dot(self, other):
+        """Returns A^T @ other, computed with the matrix the set was made from."""
+        return (other.T @ self.matrix).T
+
+    def __repr__(self):
+        return f"projection_set(shape={self.shape}," \
+               f"               nnz={self.nnz}," \
+               f"               dtype={self.matrix.data.dtype}"
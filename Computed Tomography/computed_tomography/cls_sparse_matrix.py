@@ -0,0 +1,166 @@
+from computed_tomography.cls_matrix_like import *
+from numpy import array, asarray, zeros, arange, diff, repeat, concatenate, bincount, flatnonzero, add, int32, int64, \
+    float32, result_type
+
+
+class sparse_matrix(matrix_like):
+    """A class representing a matrix in compressed sparse row (CSR) form, where only the nonzero entries of each row
+    are stored together with the columns they belong to.
+
+    In a CT scan, each beam only passes through a small number of pixels compared to the number of pixels in the
+    image, so most of the entries of the system matrix are zero and need not be stored at all."""
+
+    def __init__(self, data, indices, indptr, shape):
+        """Create a sparse matrix from its CSR arrays:
+         - data -- the nonzero values of the matrix, listed row by row
+         - indices -- the column of each of the nonzero values
+         - indptr -- the nonzero values of row k are found in data[indptr[k]:indptr[k+1]]
+         - shape -- a tuple (number of rows, number of columns)"""
+
+        self.data = asarray(data)
+        self.indices = asarray(indices, int32)
+        self.indptr = asarray(indptr, int64)
+        self.shape = (int(shape[0]), int(shape[1]))
+
+        if self.indptr.shape[0] != self.shape[0] + 1:
+            raise Exception(f"Expected indptr to have {self.shape[0] + 1} entries for a matrix with {self.shape[0]} "
+                            f"rows; received {self.indptr.shape[0]} entries.")
+
+    @classmethod
+    def from_coordinates(cls, rowIndices, columnIndices, values, shape):
+        """Create a sparse matrix from lists of (row, column, value) triples (coordinate or COO form). Entries with the
+        same row and column are added together."""
+
+        rowIndices = array(rowIndices, int64)
+        columnIndices = array(columnIndices, int64)
+        values = array(values)
+
+        # sort the entries by row, then by column, and combine any repeated entries
+        order = (rowIndices * shape[1] + columnIndices).argsort(kind="stable")
+        keys = (rowIndices * shape[1] + columnIndices)[order]
+        values = values[order]
+        if keys.shape[0] > 0:
+            isNewKey = concatenate(([True], keys[1:] != keys[:-1]))
+            starts = flatnonzero(isNewKey)
+            values = add.reduceat(values, starts)
+            keys = keys[starts]
+
+        rows, columns = keys // shape[1], keys % shape[1]
+        indptr = concatenate(([0], bincount(rows, minlength=shape[0]).cumsum()))
+        return cls(values, columns, indptr, shape)
+
+    @classmethod
+    def from_dense(cls, denseArray):
+        """Create a sparse matrix from a two-dimensional array by keeping only its nonzero entries."""
+
+        rows, columns = denseArray.nonzero()
+        indptr = concatenate(([0], bincount(rows, minlength=denseArray.shape[0]).cumsum()))
+        return cls(denseArray[rows, columns], columns, indptr, denseArray.shape)
+
+    @classmethod
+    def vstack(cls, matrices):
+        """Stack a sequence of sparse matrices with the same number of columns on top of each other."""
+
+        matrices = list(matrices)
+        numberOfColumns = matrices[0].shape[1]
+        if any(matrix.shape[1] != numberOfColumns for matrix in matrices):
+            raise Exception("Expected all matrices to have the same number of columns.")
+
+        # shift the row pointers of each matrix by the number of nonzero entries in the matrices before it
+        indptrParts = [array([0], int64)]
+        offset = 0
+        for matrix in matrices:
+            indptrParts.append(matrix.indptr[1:] + offset)
+            offset += matrix.nnz
+
+        data = concatenate([matrix.data for matrix in matrices])
+        indices = concatenate([matrix.indices for matrix in matrices])
+        numberOfRows = sum(matrix.shape[0] for matrix in matrices)
+        return cls(data, indices, concatenate(indptrParts), (numberOfRows, numberOfColumns))
+
+    @property
+    def nnz(self):
+        """The number of stored (nonzero) entries of the matrix."""
+        return self.data.shape[0]
+
+    def row_indices(self):
+        """Returns the row of each stored entry, which is the coordinate (COO) counterpart of indptr."""
+        return repeat(arange(self.shape[0], dtype=int64), diff(self.indptr))
+
+    def row_norms_squared(self):
+        """Returns the squared norm of each row of the matrix; zero rows have a norm of 0."""
+        return bincount(self.row_indices(), self.data * self.data, self.shape[0])
+
+    def row(self, k):
+        """Returns the column indices and values of the nonzero entries in row k without copying them."""
+        start, end = self.indptr[k], self.indptr[k + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def dot(self, vectorX):
+        """Returns the product A * X of this matrix A with a vector X (or with a matrix X, column by column). The
+        product is made of 32-bit floats if both A and X are, and of 64-bit floats otherwise."""
+
+        if vectorX.shape[0] != self.shape[1]:
+            raise Exception(f"Cannot multiply a {self.shape[0]} x {self.shape[1]} matrix with an array of "
+                            f"{vectorX.shape[0]} rows.")
+
+        outputType = result_type(self.data, vectorX, float32)
+        product = zeros((self.shape[0],) + vectorX.shape[1:], outputType)
+        if self.nnz == 0:
+            return product
+
+        # multiply each stored entry with its matching entry of X, then add the products row by row; only rows with
+        # at least one entry take part, since reduceat cannot produce empty sums
+        if vectorX.ndim == 1:
+            entryProducts = self.data * vectorX[self.indices]
+        else:
+            entryProducts = self.data[:, None] * vectorX[self.indices]
+        isNonEmptyRow = self.indptr[1:] > self.indptr[:-1]
+        product[isNonEmptyRow] = add.reduceat(entryProducts, self.indptr[:-1][isNonEmptyRow], axis=0)
+        return product
+
+    def transpose_dot(self, vectorY):
+        """Returns the product A^T * Y of the transpose of this matrix A with a vector Y (or with a matrix Y, column
+        by column). Each entry is added up in 64-bit floats, since it gathers the values of many beams, and the
+        product has the same type as in sparse_matrix.dot."""
+
+        if vectorY.shape[0] != self.shape[0]:
+            raise Exception(f"Cannot multiply the transpose of a {self.shape[0]} x {self.shape[1]} matrix with an "
+                            f"array of {vectorY.shape[0]} rows.")
+
+        # repeat the entry of Y of each row once for every stored entry of that row, which reads less memory than
+        # gathering Y through the row of each entry
+        outputType = result_type(self.data, vectorY, float32)
+        rowLengths = diff(self.indptr)
+        if vectorY.ndim == 1:
+            return bincount(self.indices, self.data * repeat(vectorY, rowLengths), self.shape[1]).astype(outputType,
+                                                                                                         copy=False)
+
+        product = zeros((self.shape[1], vectorY.shape[1]), outputType)
+        for j in range(vectorY.shape[1]):
+            product[:, j] = bincount(self.indices, self.data * repeat(vectorY[:, j], rowLengths), self.shape[1])
+        return product
+
+    def take_rows(self, rowNumbers):
+        """Returns a sparse matrix made of the selected rows of this matrix, in the given order."""
+
+        rowNumbers = array(rowNumbers, int64)
+        starts, ends = self.indptr[rowNumbers], self.indptr[rowNumbers + 1]
+        lengths = ends - starts
+        indptr = concatenate(([0], lengths.cumsum()))
+
+        # position of each selected entry in the data of this matrix
+        positions = repeat(starts - indptr[:-1], lengths) + arange(indptr[-1], dtype=int64)
+        return sparse_matrix(self.data[positions], self.indices[positions], indptr,
+                             (rowNumbers.shape[0], self.shape[1]))
+
+    def to_dense(self):
+        """Returns the matrix as a two-dimensional array with all of its zero entries."""
+
+        denseArray = zeros(self.shape, self.data.dtype)
+        denseArray[self.row_indices(), self.indices] = self.data
+        return denseArray
+
+    def __repr__(self):
+        return f"sparse_matrix(shape={self.shape}," \
+               f"              nnz={self.nnz}"
@@ -0,0 +1,63 @@
+from computed_tomography.cls_sparse_matrix import *
+from numpy import zeros, ones, where
+
+
+class streaming_reconstructor:
+    """A class which reconstructs an image while the directions (views) of its scan are still arriving.
+
+    Each view is added with its rows of matrix A and its measured values, and every call to update refines the
+    current pixel densities with SART projections on the views received so far, one view per block. This lets a long
+    acquisition overlap with the reconstruction instead of running before it."""
+
+    def __init__(self, numberOfPixels, relaxation: float = 1.0, doRevisitViews: bool = True):
+        """Create a streaming reconstructor for an image with a number of pixels. If doRevisitViews is False, each
+        update only projects on the views added since the previous update."""
+
+        self.numberOfPixels = numberOfPixels
+        self.relaxation = relaxation
+        self.doRevisitViews = doRevisitViews
+        self.currentX = zeros(numberOfPixels)
+        self.views = []
+        self.numberOfNewViews = 0
+
+    @property
+    def numberOfViews(self):
+        """The number of views received so far."""
+        return len(self.views)
+
+    def add_view(self, submatrixA, viewB):
+        """Adds the rows of matrix A (an array or a sparse_matrix) and the measured values of one view."""
+
+        if submatrixA.shape[1] != self.numberOfPixels:
+            raise Exception(f"Expected the rows of matrix A to have {self.numberOfPixels} columns; received "
+                            f"{submatrixA.shape[1]}.")
+
+        # inverse row and column sums of the view, which weigh its residuals and updates as in simultaneous_iterates
+        rowSums = submatrixA @ ones(self.numberOfPixels)
+        columnSums = ones(submatrixA.shape[0]) @ submatrixA
+        inverseRowSums = where(rowSums > 0, 1 / where(rowSums > 0, rowSums, 1), 0.0)
+        inverseColumnSums = where(columnSums > 0, 1 / where(columnSums > 0, columnSums, 1), 0.0)
+
+        self.views.append((submatrixA, viewB, inverseRowSums, inverseColumnSums))
+        self.numberOfNewViews += 1
+
+    def update(self, sweeps: int = 1):
+        """Refines the current pixel densities with a number of SART sweeps and returns them. The newest views are
+        projected on first."""
+
+        if self.doRevisitViews:
+            views = self.views[::-1]
+        else:
+            views = self.views[len(self.views) - self.numberOfNewViews:][::-1]
+
+        for s in range(sweeps):
+            for submatrixA, viewB, inverseRowSums, inverseColumnSums in views:
+                weightedResiduals = inverseRowSums * (viewB - submatrixA @ self.currentX)
+                self.currentX += self.relaxation * inverseColumnSums * (weightedResiduals @ submatrixA)
+
+        self.numberOfNewViews = 0
+        return self.currentX
+
+    def __repr__(self):
+        return f"streaming_reconstructor(numberOfPixels={self.numberOfPixels}," \
+               f"                        numberOfViews={self.numberOfViews}"
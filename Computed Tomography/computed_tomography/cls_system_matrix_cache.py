@@ -0,0 +1,148 @@
+from computed_tomography.func_system_matrix import *
+from numpy import savez, load, asarray, float64
+from hashlib import sha1
+from collections import OrderedDict
+import numpy
+import os
+
+
+class system_matrix_cache:
+    """A class which keeps the matrices A of CT scans so that they are only ever built once for each scan geometry.
+
+    Matrix A only depends on the size of the image, on the beam array (the translation angle and the inclination of
+    each of its beams, and its beam width), on the number of directions of the scan, on the projection model its
+    coefficients are computed with (see pixel_grid.trace_beams) and on how the matrix is stored (its format and
+    type), so scanning a new image with the same setup can reuse it. Matrices are kept in memory and, if a cache
+    directory is given, also saved in it as .npz files so that they can be reused by later programs. A matrix may be
+    saved in its compact form, with only the rows of the views which are not mirror images or rotations of other
+    views (see view_symmetries), which makes its file several times smaller."""
+
+    # changes whenever the way matrix A is computed changes, so that matrices saved by older versions are not reused
+    modelVersion = "trace-4"
+
+    def __init__(self, cacheDirectory: str = None, maxMatricesInMemory: int = 4):
+        """Create a cache of system matrices, optionally saved in (and loaded from) a directory.
+
+        At most maxMatricesInMemory matrices are kept in memory (or all of them, if it is None); once there are more,
+        the matrix used least recently is dropped from memory, although it stays in the cache directory if there is
+        one."""
+
+        if maxMatricesInMemory is not None and maxMatricesInMemory < 1:
+            raise Exception(f"Expected maxMatricesInMemory to be at least 1; received {maxMatricesInMemory}.")
+
+        self.cacheDirectory = cacheDirectory
+        self.maxMatricesInMemory = maxMatricesInMemory
+        self.matrices = OrderedDict()
+
+        if cacheDirectory is not None:
+            os.makedirs(cacheDirectory, exist_ok=True)
+
+    @classmethod
+    def geometry_key(cls, imageWidth, imageHeight, beamArray, numberOfDirections, matrixFormat,
+                     projectionModel: str = "center_line", dtype=float64):
+        """Returns the key (a hexadecimal hash) of a scan geometry."""
+
+        # the beams are known by the angles which place them in the beam array, whatever kind of beam array it is
+        beamAngles = sha1(asarray(beamArray.translationAngles, float64).tobytes() +
+                          asarray(beamArray.inclinationAngles, float64).tobytes()).hexdigest()
+        geometry = (cls.modelVersion, projectionModel, imageWidth, imageHeight, beamArray.numberOfBeams, beamAngles,
+                    float(beamArray.beamWidth), numberOfDirections, matrixFormat)
+        # matrices of 64-bit floats keep the keys they had before other types were possible
+        dtype = matrix_type(dtype)
+        if dtype != float64:
+            geometry += (numpy.dtype(dtype).name,)
+        return sha1(repr(geometry).encode()).hexdigest()
+
+    def file_path(self, key):
+        """Returns the path of the .npz file of a key in the cache directory."""
+        return os.path.join(self.cacheDirectory, f"system_matrix_{key}.npz")
+
+    def get(self, key):
+        """Returns the matrix saved under the key, or None if there is none."""
+
+        if key in self.matrices:
+            self.matrices.move_to_end(key)
+            return self.matrices[key]
+
+        if self.cacheDirectory is None or not os.path.exists(self.file_path(key)):
+            return None
+
+        with load(self.file_path(key)) as arrays:
+            if "matrixA" in arrays:
+                matrixA = arrays["matrixA"]
+            else:
+                matrixA = sparse_matrix(arrays["data"], arrays["indices"], arrays["indptr"], tuple(arrays["shape"]))
+
+            # rebuild the full matrix from the rows of the fundamental views
+            if "sourceViews" in arrays:
+                imageWidth, imageHeight, numberOfBeams = arrays["geometry"]
+                matrixA = expand_symmetric_views(matrixA, imageWidth, imageHeight, numberOfBeams,
+                                                 arrays["sourceViews"], arrays["rotations"], arrays["mirrors"])
+
+        self.keep_in_memory(key, matrixA)
+        return matrixA
+
+    def keep_in_memory(self, key, matrixA):
+        """Keeps a matrix in memory under the key as the one used most recently, dropping the matrices used least
+        recently from memory if there are more than maxMatricesInMemory."""
+
+        self.matrices[key] = matrixA
+        self.matrices.move_to_end(key)
+        while self.maxMatricesInMemory is not None and len(self.matrices) > self.maxMatricesInMemory:
+            self.matrices.popitem(last=False)
+
+    def put(self, key, matrixA, compactForm=None):
+        """Saves a matrix (an array or a sparse_matrix) under the key.
+
+        The compact form of the matrix, a tuple (fundamental matrix, (sourceViews, rotations, mirrors), (image width,
+        image height, number of beams)) as returned by compact_system_matrix, may also be given; if so, only the
+        compact form is written to the cache directory."""
+
+        self.keep_in_memory(key, matrixA)
+        if self.cacheDirectory is None:
+            return
+
+        arrays = {}
+        if compactForm is not None:
+            matrixA, (sourceViews, rotations, mirrors), geometry = compactForm
+            arrays = {"sourceViews": sourceViews, "rotations": rotations, "mirrors": mirrors, "geometry": geometry}
+
+        # write to a temporary file first, so that an interrupted save never leaves a broken file in the cache
+        temporaryPath = self.file_path(key) + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            if isinstance(matrixA, sparse_matrix):
+                savez(file, data=matrixA.data, indices=matrixA.indices, indptr=matrixA.indptr, shape=matrixA.shape,
+                      **arrays)
+            else:
+                savez(file, matrixA=matrixA, **arrays)
+        os.replace(temporaryPath, self.file_path(key))
+
+    def get_or_build(self, key, buildMatrix):
+        """Returns the matrix saved under the key, or builds it by calling buildMatrix() and saves it if there is
+        none. buildMatrix may either return the matrix or its compact form (see put)."""
+
+        matrixA = self.get(key)
+        if matrixA is None:
+            builtMatrix = buildMatrix()
+            if isinstance(builtMatrix, tuple):
+                fundamentalMatrix, symmetries, geometry = builtMatrix
+                matrixA = expand_symmetric_views(fundamentalMatrix, *geometry, *symmetries)
+                self.put(key, matrixA, builtMatrix)
+            else:
+                matrixA = builtMatrix
+                self.put(key, matrixA)
+        return matrixA
+
+    def clear(self):
+        """Removes every matrix from the cache, including the files in the cache directory."""
+
+        self.matrices = OrderedDict()
+        if self.cacheDirectory is not None:
+            for fileName in os.listdir(self.cacheDirectory):
+                if fileName.startswith("system_matrix_") and fileName.endswith(".npz"):
+                    os.remove(os.path.join(self.cacheDirectory, fileName))
+
+    def __repr__(self):
+        return f"system_matrix_cache(cacheDirectory={self.cacheDirectory}," \
+               f"                   maxMatricesInMemory={self.maxMatricesInMemory}," \
+               f"                   numberOfMatrices={len(self.matrices)}"
@@ -0,0 +1,140 @@
+from computed_tomography.cls_beam_array_fan_mode import *
+from computed_tomography.cls_beam_array_parallel import *
+from numpy import array, arange, broadcast_to, zeros, where, floor, clip, arcsin, degrees, radians, sin, cos, pi, \
+    diff, interp, int64
+from math import ceil
+
+def ramp_filter(projections, samplingGap):
+    """Filters each row of projections with the ramp (Ram-Lak) filter |f| by convolution in the frequency domain,
+    using the Fast Fourier Transform (FFT) from the fast_fourier_transform package of this repository.
+
+    The filter is built from its samples in the physical domain (rather than sampling |f| directly), which keeps the
+    average value of the filtered projections correct."""
+
+    try:
+        from fast_fourier_transform import FFT, IFFT, nearest_power_of_2
+    except ImportError:
+        raise Exception("Filtered back-projection requires the fast_fourier_transform package found in the 'Fast "
+                        "Fourier Transform' folder of this repository; add that folder to the Python path.")
+
+    numberOfViews, numberOfSamples = projections.shape
+
+    # pad each projection by zeros to a power of 2 which is at least twice its length, so that the circular
+    # convolution computed by the FFT does not wrap around
+    n = nearest_power_of_2(2*numberOfSamples)
+
+    # samples of the ramp filter at the offsets 0, 1, 2, ..., -2, -1 (times the sampling gap):
+    #   h(0) = 1 / (4 gap^2),   h(k) = -1 / (k pi gap)^2 for odd k,   h(k) = 0 for even k
+    offsets = arange(n)
+    offsets = where(offsets < n//2, offsets, offsets - n)
+    filterY = zeros(n)
+    filterY[0] = 1 / (4*samplingGap**2)
+    isOdd = offsets % 2 == 1
+    filterY[isOdd] = -1 / (offsets[isOdd]*pi*samplingGap)**2
+    filterU = FFT([complex(y) for y in filterY])
+
+    filteredProjections = zeros((numberOfViews, numberOfSamples))
+    for v in range(numberOfViews):
+        projectionY = [complex(y) for y in projections[v]] + [0j]*(n - numberOfSamples)
+        projectionU = FFT(projectionY)
+        filteredY = IFFT([u1*u2 for u1, u2 in zip(projectionU, filterU)])
+        filteredProjections[v] = [y.real * samplingGap for y in filteredY[:numberOfSamples]]
+
+    return filteredProjections
+
+def rebin_to_parallel(sinogram, beamArray, scanningAngles, radius, detectorPositions):
+    """Resamples a sinogram measured by a beam array into a parallel-beam sinogram, where row k holds the line
+    integrals along the direction scanningAngles[k] at the given (signed) distances detectorPositions from the center
+    of the image. The beams must either all be parallel (inclinations of 0, as in parallel mode) or all start from
+    one point (translation angles of 0, as in fan mode), in order of their other angle.
+
+    A beam with translation angle T and inclination I placed at a central angle C travels along the direction
+    C + I at a distance radius*sin(I - T) from the center. Each wanted line is therefore found between two beams and
+    two directions of the scan, and its value is interpolated from them. Lines outside the beam array's spread are
+    treated as unmeasured (0)."""
+
+    numberOfDirections, numberOfBeams = sinogram.shape
+    if numberOfBeams < 2:
+        raise Exception("Filtered back-projection needs a beam array with at least 2 beams.")
+
+    # the angles which tell the beams apart: their translation angles (parallel beams) or inclinations (fan beams)
+    isFanMode = not (beamArray.inclinationAngles == 0).all()
+    arrayAngles = beamArray.inclinationAngles if isFanMode else beamArray.translationAngles
+    angleSteps = diff(arrayAngles)
+    if (isFanMode and not (beamArray.translationAngles == 0).all()) or \
+            not ((angleSteps > 0).all() or (angleSteps < 0).all()):
+        raise Exception("Filtered back-projection needs a beam array whose beams are either all parallel or all "
+                        "start from one point, in order of their translation angles or inclinations.")
+
+    # angle of the wanted line relative to the beam array, measured as a translation angle (parallel mode) or an
+    # inclination (fan mode), and the central angle of the beam array which measures it
+    offsetAngles = degrees(arcsin(clip(detectorPositions / radius, -1, 1)))
+    if isFanMode:
+        beamAngles = offsetAngles
+        centralAngles = scanningAngles[:, None] - offsetAngles[None, :]
+    else:
+        beamAngles = -offsetAngles
+        centralAngles = broadcast_to(scanningAngles[:, None], (numberOfDirections, offsetAngles.shape[0]))
+
+    # fractional position of the wanted line among the beams and among the (evenly spaced) directions of the scan
+    beamNumbers = arange(numberOfBeams, dtype=float)
+    if angleSteps[0] < 0:
+        arrayAngles, beamNumbers = arrayAngles[::-1], beamNumbers[::-1]
+    beamPositions = interp(beamAngles, arrayAngles, beamNumbers)
+    isMeasured = (beamAngles >= arrayAngles[0]) & (beamAngles <= arrayAngles[-1])
+    directionPositions = ((centralAngles - scanningAngles[0]) % 360) / (360 / numberOfDirections)
+
+    # bilinear interpolation, wrapping around the circle in the directions
+    beam1 = clip(floor(beamPositions).astype(int64), 0, numberOfBeams - 2)
+    beamWeight = beamPositions - beam1
+    direction1 = floor(directionPositions).astype(int64) % numberOfDirections
+    direction2 = (direction1 + 1) % numberOfDirections
+    directionWeight = directionPositions - floor(directionPositions)
+
+    parallelSinogram = (1 - directionWeight) * ((1 - beamWeight)*sinogram[direction1, beam1[None, :]] +
+                                                beamWeight*sinogram[direction1, beam1[None, :] + 1]) + \
+                       directionWeight * ((1 - beamWeight)*sinogram[direction2, beam1[None, :]] +
+                                          beamWeight*sinogram[direction2, beam1[None, :] + 1])
+
+    return where(isMeasured[None, :], parallelSinogram, 0.0)
+
+def filtered_back_projection(sinogram, pixelGrid, beamArray, scanningAngles):
+    """Reconstructs the pixel densities of an image in one pass from its sinogram, an array whose row k holds the
+    values measured by each beam of beamArray when placed at the central angle scanningAngles[k]. The scanning angles
+    are assumed to be evenly spaced around the whole circle, as in CAT_Scanner.scan.
+
+    The sinogram is first rebinned to parallel lines, each projection is then ramp-filtered, and finally each
+    filtered projection is smeared back across the image along its direction (back-projection). The cost grows with
+    the number of directions times the number of pixels.
+
+    Returns a flat array of pixel densities, in the same order as the pixels of the flattened image."""
+
+    scanningAngles = array(scanningAngles, float)
+    radius = pixelGrid.minRadius
+
+    # evenly spaced parallel lines one pixel apart, reaching across the whole circumcircle of the image
+    samplingGap = 1.0
+    halfCount = ceil(radius / samplingGap)
+    detectorPositions = arange(-halfCount, halfCount + 1) * samplingGap
+
+    parallelSinogram = rebin_to_parallel(sinogram, beamArray, scanningAngles, radius, detectorPositions)
+    filteredSinogram = ramp_filter(parallelSinogram, samplingGap)
+
+    # position of each pixel's center relative to the center of the image
+    pixelX = ((arange(pixelGrid.imageWidth) + 0.5)*pixelGrid.pixelSize - pixelGrid.centerX)[None, :]
+    pixelY = ((arange(pixelGrid.imageHeight) + 0.5)*pixelGrid.pixelSize - pixelGrid.centerY)[:, None]
+
+    densities = zeros((pixelGrid.imageHeight, pixelGrid.imageWidth))
+    for angle, filteredProjection in zip(radians(scanningAngles), filteredSinogram):
+        # distance of each pixel's center from the line through the center of the image in this direction,
+        # converted to a fractional position among the parallel lines
+        positions = (-pixelX*sin(angle) + pixelY*cos(angle) - detectorPositions[0]) / samplingGap
+        line1 = clip(floor(positions).astype(int64), 0, detectorPositions.shape[0] - 2)
+        weight = clip(positions - line1, 0, 1)
+        densities += (1 - weight)*filteredProjection[line1] + weight*filteredProjection[line1 + 1]
+
+    # every line is measured twice when going around the whole circle, so the back-projections are averaged over
+    # 2*pi and not pi radians
+    densities *= pi / scanningAngles.shape[0]
+
+    return densities.flatten()
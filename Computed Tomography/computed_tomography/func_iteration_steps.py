@@ -0,0 +1,24 @@
+def check_system(initialX, matrixA, vectorB):
+    """Raises an exception unless initialX, matrixA and vectorB have matching sizes."""
+
+    vectorDimension = initialX.shape[0]
+    numberOfEquations = matrixA.shape[0]
+    if not (vectorDimension == matrixA.shape[1] and numberOfEquations == vectorB.shape[0]):
+        raise Exception(f"Expected matrixA to have size {numberOfEquations} x {vectorDimension} and vectorB to have"
+                        f" size {numberOfEquations} x 1.")
+
+def finish_iteration(hooks, phase, iteration, iterations, seconds, rowsProcessed, residualNorm, currentX,
+                     iterationCallback=None, convergenceMonitor=None, normB=None):
+    """Reports a finished iteration of an iterative method to hooks, passes X to iterationCallback and the residual
+    to convergenceMonitor, in this order. Returns True if the monitor decides that the method should stop."""
+
+    hooks.iteration_finished(phase, iteration, iterations, seconds, rowsProcessed, residualNorm)
+
+    if iterationCallback is not None:
+        iterationCallback(iteration, currentX)
+
+    if convergenceMonitor is not None:
+        if convergenceMonitor.update(currentX, residualNorm, normB, seconds):
+            hooks.message(f"Stopped after iteration # {iteration} ({convergenceMonitor.stoppingReason})")
+            return True
+    return False
@@ -0,0 +1,162 @@
+from computed_tomography.cls_sparse_matrix import *
+from computed_tomography.cls_convergence_monitor import *
+from computed_tomography.cls_ct_hooks import *
+from computed_tomography.func_iteration_steps import *
+from numpy import array, asarray, sqrt, where, result_type, float32, float64
+from numpy.linalg import norm
+from time import time
+
+def column_norms(arrayObj):
+    """Returns the norm of a flat array, or the norm of each column of a 2 dimensional array, added up in 64-bit
+    floats."""
+    return sqrt((arrayObj * arrayObj).sum(axis=0, dtype=float64))
+
+def total_norm(arrayObj):
+    """Returns the norm of all entries of an array, added up in 64-bit floats."""
+    return sqrt((arrayObj * arrayObj).sum(dtype=float64))
+
+def scaled(vectors, coefficients):
+    """Returns a vector times a coefficient (or the columns of an array times one coefficient each), in the
+    precision of the vectors."""
+    return vectors * asarray(coefficients, vectors.dtype)
+
+def safe_divide(numerator, denominator):
+    """Returns numerator / denominator, with 0 wherever the denominator is 0."""
+    return numerator / where(denominator != 0, denominator, 1) * (denominator != 0)
+
+def cgls_iterates(initialX, matrixA, vectorB, iterations, convergenceMonitor=None, iterationCallback=None,
+                  hooks=None):
+    """Approximates the least squares solution of the linear system matrixA * X = vectorB, the X which makes
+    ||matrixA * X - vectorB|| smallest, with the conjugate gradient method applied to the normal equations
+    A^T * A * X = A^T * B (CGLS). This process is done for a given number of iterations, starting from initialX.
+
+    Each iteration multiplies by matrixA once and by its transpose once, and moves X along a direction conjugate to
+    all earlier ones, so the residual usually falls in far fewer iterations than with projection_iterates or
+    simultaneous_iterates. matrixA is only ever multiplied, so it may be an array, a sparse_matrix or a
+    projection_operator which never stores the matrix.
+
+    Several systems with the same matrixA are solved at once as by simultaneous_iterates; each column takes its own
+    steps.
+
+    The vectors of the iterations have the precision of initialX and matrixA (see simultaneous_iterates), while the
+    step sizes are computed from norms added up in 64-bit floats. Since every direction builds on the rounding of all
+    earlier ones, iterations in 32-bit floats drift further from those in 64-bit floats than with
+    simultaneous_iterates, although they reduce the residual just as fast.
+
+    The convergenceMonitor, iterationCallback and hooks are used as by simultaneous_iterates; the progress is
+    reported under the phase "cgls", and the residual of every iteration is known without extra work."""
+
+    check_system(initialX, matrixA, vectorB)
+
+    workingType = result_type(initialX, float32)
+    currentX = array(initialX, workingType)
+    hooks = silentHooks if hooks is None else hooks
+    normB = None
+    if convergenceMonitor is not None:
+        convergenceMonitor.reset()
+        normB = norm(vectorB)
+
+    # the residual R = B - A*X, the gradient S = A^T * R of the normal equations and the search direction P
+    residual = asarray(vectorB, workingType) - matrixA @ currentX
+    gradient = (residual.T @ matrixA).T
+    direction = gradient.copy()
+    gamma = column_norms(gradient)**2
+
+    time1 = time()
+    hooks.phase_started("cgls", iterations=iterations)
+    p = -1
+    for p in range(iterations):
+        time2 = time()
+        projectedDirection = matrixA @ direction
+        stepSize = safe_divide(gamma, column_norms(projectedDirection)**2)
+        currentX += scaled(direction, stepSize)
+        residual -= scaled(projectedDirection, stepSize)
+
+        gradient = (residual.T @ matrixA).T
+        newGamma = column_norms(gradient)**2
+        direction = gradient + scaled(direction, safe_divide(newGamma, gamma))
+        gamma = newGamma
+        time3 = time()
+
+        residualNorm = total_norm(residual)
+        if finish_iteration(hooks, "cgls", p + 1, iterations, time3 - time2, matrixA.shape[0], residualNorm, currentX,
+                            iterationCallback, convergenceMonitor, normB):
+            break
+    time4 = time()
+
+    hooks.phase_finished("cgls", time4 - time1, iterations=p + 1)
+
+    return currentX
+
+def lsqr_iterates(initialX, matrixA, vectorB, iterations, convergenceMonitor=None, iterationCallback=None,
+                  hooks=None):
+    """Approximates the least squares solution of the linear system matrixA * X = vectorB with the LSQR method of
+    Paige and Saunders, for a given number of iterations starting from initialX.
+
+    LSQR builds the same iterates as cgls_iterates in exact arithmetic, but through the Golub-Kahan bidiagonalization
+    of matrixA, which keeps its steps accurate for longer on badly conditioned systems. Each iteration multiplies by
+    matrixA once and by its transpose once, so matrixA may be an array, a sparse_matrix or a projection_operator.
+
+    Several systems are solved at once as by simultaneous_iterates. As in cgls_iterates, the vectors have the
+    precision of initialX and matrixA, while the rotations are computed in 64-bit floats.
+
+    The convergenceMonitor, iterationCallback and hooks are used as by simultaneous_iterates; the progress is
+    reported under the phase "lsqr", and the residual of every iteration is estimated without extra work."""
+
+    check_system(initialX, matrixA, vectorB)
+
+    workingType = result_type(initialX, float32)
+    currentX = array(initialX, workingType)
+    hooks = silentHooks if hooks is None else hooks
+    normB = None
+    if convergenceMonitor is not None:
+        convergenceMonitor.reset()
+        normB = norm(vectorB)
+
+    # start the bidiagonalization from the residual of initialX: beta*U = B - A*X and alpha*V = A^T * U
+    vectorU = asarray(vectorB, workingType) - matrixA @ currentX
+    beta = column_norms(vectorU)
+    vectorU = scaled(vectorU, safe_divide(1.0, beta))
+    vectorV = (vectorU.T @ matrixA).T
+    alpha = column_norms(vectorV)
+    vectorV = scaled(vectorV, safe_divide(1.0, alpha))
+
+    vectorW = vectorV.copy()
+    phiBar, rhoBar = beta, alpha
+
+    time1 = time()
+    hooks.phase_started("lsqr", iterations=iterations)
+    p = -1
+    for p in range(iterations):
+        time2 = time()
+
+        # continue the bidiagonalization
+        vectorU = matrixA @ vectorV - scaled(vectorU, alpha)
+        beta = column_norms(vectorU)
+        vectorU = scaled(vectorU, safe_divide(1.0, beta))
+        vectorV = (vectorU.T @ matrixA).T - scaled(vectorV, beta)
+        alpha = column_norms(vectorV)
+        vectorV = scaled(vectorV, safe_divide(1.0, alpha))
+
+        # apply the next plane rotation, then update X and the search direction W
+        rho = sqrt(rhoBar**2 + beta**2)
+        cosine, sine = safe_divide(rhoBar, rho), safe_divide(beta, rho)
+        theta = sine * alpha
+        rhoBar = -cosine * alpha
+        phi = cosine * phiBar
+        phiBar = sine * phiBar
+
+        currentX += scaled(vectorW, safe_divide(phi, rho))
+        vectorW = vectorV - scaled(vectorW, safe_divide(theta, rho))
+        time3 = time()
+
+        # |phiBar| is the norm of the residual of each system
+        residualNorm = norm(phiBar)
+        if finish_iteration(hooks, "lsqr", p + 1, iterations, time3 - time2, matrixA.shape[0], residualNorm, currentX,
+                            iterationCallback, convergenceMonitor, normB):
+            break
+    time4 = time()
+
+    hooks.phase_finished("lsqr", time4 - time1, iterations=p + 1)
+
+    return currentX
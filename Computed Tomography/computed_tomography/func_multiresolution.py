@@ -0,0 +1,33 @@
+from computed_tomography.cls_pixel_grid import *
+from numpy import arange, clip, floor, int64
+
+def upsample_densities(coarseX, coarseGrid, fineGrid):
+    """Returns the pixel densities of a coarse pixel grid (see pixel_grid.downsampled) interpolated on a finer grid
+    over the same image, such as a starting point for reconstructing the image at the finer resolution.
+
+    The density at the center of each fine pixel is interpolated bilinearly from the four closest coarse pixel
+    centers. coarseX is a flat array or an array with one flattened coarse image in each column, and the result has
+    the same layout."""
+
+    # positions of the centers of the fine pixels, measured in coarse pixels from the center of the first one
+    fineX = ((arange(fineGrid.imageWidth) + 0.5)*fineGrid.pixelSize - fineGrid.centerX + coarseGrid.centerX) / \
+        coarseGrid.pixelSize - 0.5
+    fineY = ((arange(fineGrid.imageHeight) + 0.5)*fineGrid.pixelSize - fineGrid.centerY + coarseGrid.centerY) / \
+        coarseGrid.pixelSize - 0.5
+    fineX = clip(fineX, 0, coarseGrid.imageWidth - 1)
+    fineY = clip(fineY, 0, coarseGrid.imageHeight - 1)
+
+    # the coarse pixels to the left of and above each fine pixel center, and the weights of the next ones
+    column1 = clip(floor(fineX).astype(int64), 0, max(coarseGrid.imageWidth - 2, 0))
+    row1 = clip(floor(fineY).astype(int64), 0, max(coarseGrid.imageHeight - 2, 0))
+    column2 = clip(column1 + 1, 0, coarseGrid.imageWidth - 1)
+    row2 = clip(row1 + 1, 0, coarseGrid.imageHeight - 1)
+    weightX = (fineX - column1)[None, :, None]
+    weightY = (fineY - row1)[:, None, None]
+
+    coarseImage = coarseX.reshape((coarseGrid.imageHeight, coarseGrid.imageWidth, -1))
+    top = (1 - weightX)*coarseImage[row1][:, column1] + weightX*coarseImage[row1][:, column2]
+    bottom = (1 - weightX)*coarseImage[row2][:, column1] + weightX*coarseImage[row2][:, column2]
+    fineImage = (1 - weightY)*top + weightY*bottom
+
+    return fineImage.reshape((fineGrid.numberOfPixels,) + coarseX.shape[1:])
@@ -0,0 +1,56 @@
+from numpy import arange, meshgrid, zeros, clip, cos, sin, radians, uint8
+from numpy.random import default_rng
+from PIL import Image
+
+# the ellipses of the modified Shepp-Logan phantom as (density, semi-axis a, semi-axis b, center x, center y, angle),
+# on a square from -1 to 1 in both directions
+sheppLoganEllipses = [(1.0, 0.69, 0.92, 0.0, 0.0, 0),
+                      (-0.8, 0.6624, 0.874, 0.0, -0.0184, 0),
+                      (-0.2, 0.11, 0.31, 0.22, 0.0, -18),
+                      (-0.2, 0.16, 0.41, -0.22, 0.0, 18),
+                      (0.1, 0.21, 0.25, 0.0, 0.35, 0),
+                      (0.1, 0.046, 0.046, 0.0, 0.1, 0),
+                      (0.1, 0.046, 0.046, 0.0, -0.1, 0),
+                      (0.1, 0.046, 0.023, -0.08, -0.605, 0),
+                      (0.1, 0.023, 0.023, 0.0, -0.606, 0),
+                      (0.1, 0.023, 0.046, 0.06, -0.605, 0)]
+
+def phantom_coordinates(imageWidth, imageHeight):
+    """Returns the coordinates (x, y) of the center of each pixel on a square from -1 to 1 in both directions, with y
+    going up, as two arrays of size imageHeight x imageWidth."""
+
+    return meshgrid((arange(imageWidth) + 0.5) / imageWidth * 2 - 1, 1 - (arange(imageHeight) + 0.5) / imageHeight * 2)
+
+def shepp_logan_phantom(imageWidth, imageHeight):
+    """Returns the pixel densities (from 0 to 10) of the modified Shepp-Logan phantom, a standard test image of a
+    head made of overlapping ellipses, as an array of size imageHeight x imageWidth."""
+
+    x, y = phantom_coordinates(imageWidth, imageHeight)
+    densities = zeros((imageHeight, imageWidth))
+    for density, a, b, centerX, centerY, angle in sheppLoganEllipses:
+        # coordinates relative to the ellipse, turned along its axes
+        dx, dy = x - centerX, y - centerY
+        u = dx*cos(radians(angle)) + dy*sin(radians(angle))
+        v = -dx*sin(radians(angle)) + dy*cos(radians(angle))
+        densities[(u/a)**2 + (v/b)**2 <= 1] += density
+
+    return clip(10*densities, 0, 10)
+
+def disk_phantom(imageWidth, imageHeight, numberOfDisks: int = 8, seed: int = 0):
+    """Returns the pixel densities (from 0 to 10) of a phantom made of a number of random disks of random densities,
+    drawn with the given seed, as an array of size imageHeight x imageWidth. Overlapping disks add their densities."""
+
+    randomGenerator = default_rng(seed)
+    x, y = phantom_coordinates(imageWidth, imageHeight)
+    densities = zeros((imageHeight, imageWidth))
+    for d in range(numberOfDisks):
+        centerX, centerY = randomGenerator.uniform(-0.6, 0.6, 2)
+        radius = randomGenerator.uniform(0.05, 0.3)
+        densities[(x - centerX)**2 + (y - centerY)**2 <= radius**2] += randomGenerator.uniform(1, 5)
+
+    return clip(densities, 0, 10)
+
+def phantom_image(densities):
+    """Returns a grayscale image of an array of pixel densities from 0 (white) to 10 (black), which a CAT_Scanner
+    reads back as (nearly) the same densities."""
+    return Image.fromarray(clip(255 - 25.5*densities, 0, 255).round().astype(uint8), "L")
@@ -1,14 +1,19 @@
-from numpy import dot
+from numpy import dot, multiply
 
-def projection_hyperplane(XPoint, A, b):
+def projection_hyperplane(XPoint, A, b, normSquaredA=None):
     """Finds the point in Rn on the hyperplane formed by the equation dot(A, x) = a1*x1 + a2*x2 + .. + an*xn = b that
-    is closest to XPoint. Assumes all inputs are 1 dimensional arrays.
+    is closest to XPoint. Assumes all inputs are 1 dimensional arrays, except for XPoint which may also be a
+    2 dimensional array whose columns are each projected on the hyperplane.
 
     In other words, it finds the orthogonal / perpendicular projection of XPoint on the hyperplane in Rn."""
 
     """Finds the orthogonal projection X of XPoint on the hyperplane formed by the equation dot(A, X) = b,
     where XPoint, X, and A are vectors in n-space and b is a scalar."""
 
-    projectionFactor = (b - dot(XPoint, A)) / dot(A, A)
-    projectionX = XPoint + projectionFactor*A
+    # the squared norm dot(A, A) may be given in advance when projecting on the same hyperplane many times
+    if normSquaredA is None:
+        normSquaredA = dot(A, A)
+
+    projectionFactor = (b - dot(A, XPoint)) / normSquaredA
+    projectionX = XPoint + multiply.outer(A, projectionFactor)
     return projectionX
\ No newline at end of file
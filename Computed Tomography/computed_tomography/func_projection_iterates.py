@@ -1,61 +1,133 @@
 from computed_tomography.func_projection_hyperplane import *
+from computed_tomography.cls_sparse_matrix import *
+from computed_tomography.cls_convergence_monitor import *
+from computed_tomography.cls_projection_set import *
+from computed_tomography.cls_ct_hooks import *
+from computed_tomography.func_iteration_steps import *
+from numpy import array, asarray, dot, multiply, einsum, flatnonzero, float32, float64
+from numpy.linalg import norm
 from time import time
 
-def projection_iterates(initialX, matrixA, vectorB, iterations, returnMultipleIterates:bool = False):
+def row_norms_squared(matrixA):
+    """Returns the squared norm dot(A, A) of each row A of matrixA, which is either an array or a sparse_matrix."""
+
+    if isinstance(matrixA, sparse_matrix):
+        return matrixA.row_norms_squared()
+    return einsum("ij,ij->i", matrixA, matrixA)
+
+def projection_iterates(initialX, matrixA, vectorB, iterations, returnMultipleIterates:bool = False,
+                        convergenceMonitor=None, iterationCallback=None, rowOrder=None, relaxation: float = 1.0,
+                        constraints=None, hooks=None):
     """Repeatedly transforms the vector initialX in N-space by sequentially projecting it onto the M hyperplanes each
     formed by the equation dot(A, X) = a1*x1 + a2*x2 + ... + an*xn = b, where A is each row of matrixA and b is a value
     from vectorB. This process is done for a given number of iterations.
 
-    Assumes initialX, matrixA, and vectorB are arrays and iterations is a positive integer.
+    Assumes initialX and vectorB are arrays, matrixA is an array, a sparse_matrix or a projection_set, and iterations
+    is a positive integer. An array or a sparse_matrix is packed into a projection_set first; passing a
+    projection_set directly (for example one with float32 weights) skips this step. A matrixA of 32-bit floats keeps
+    its 32-bit weights, but X is always updated in 64-bit floats, since the many small steps of the rows would
+    otherwise be lost to rounding.
 
     By default, it returns one vector resulting from applying all projections in all iterations.
     If returnMultipleIterates is set to True, it returns a list of M vectors representing the projection vectors
     obtained in the last iteration of the algorithm
 
     Each output vector can be interpreted as an approximate solution to the linear system matrixA * X = vectorB in
-    M equations and N unknown variables."""
+    M equations and N unknown variables.
+
+    The rows are visited in the order of rowOrder, an array of row numbers (see row_ordering), or from first to last
+    if it is None. Visiting rows whose hyperplanes are far from parallel one after another needs fewer iterations.
 
-    # test whether the sizes of the inputs are valid
-    vectorDimension = initialX.shape[0]
-    numberOfEquations = matrixA.shape[0]
-    isValidInput = (vectorDimension == matrixA.shape[1]) and (numberOfEquations == vectorB.shape[0])
+    Each projection moves X by relaxation times the distance to the hyperplane, where relaxation is from 0 to 2;
+    values below 1 damp the effect of noise in vectorB. If constraints (such as a density_constraints) are given,
+    constraints.apply(X) changes X in place after each iteration, for example to keep it within the range of pixel
+    densities.
 
-    if not isValidInput:
-        raise Exception(f"Expected matrixA to have size {numberOfEquations} x {vectorDimension} and vectorB to have"
-                        f" size {numberOfEquations} x 1.")
+    Several systems with the same matrixA, the convergenceMonitor, iterationCallback and hooks are handled as by
+    simultaneous_iterates; the progress is reported under the phase "kaczmarz". If the monitor stops the algorithm
+    early, the vectors returned when returnMultipleIterates is True are those of the last iteration actually done."""
 
+    check_system(initialX, matrixA, vectorB)
+
+    # The rows are kept in a projection_set, which holds the nonzero entries and the inverse squared norm of each row
+    # so that each projection only reads and writes the pixels hit by its beam. Returning the iterates of every row
+    # needs a full vector per row anyway, so then the rows are projected on one at a time instead.
+    if returnMultipleIterates:
+        projections = None
+        if isinstance(matrixA, projection_set):
+            matrixA = matrixA.matrix
+    elif isinstance(matrixA, projection_set):
+        projections = matrixA
+    else:
+        weightType = matrixA.data.dtype if isinstance(matrixA, sparse_matrix) else asarray(matrixA).dtype
+        projections = projection_set(matrixA, float32 if weightType == float32 else float64)
 
-    currentX = initialX
+    currentX = array(initialX, float)
     recentIterates = []
+    isSparse = isinstance(matrixA, sparse_matrix)
 
-    zeroRow = [0]*vectorDimension
-    isZeroRow = lambda row: sum(row == zeroRow) == vectorDimension
+    # compute the squared norm of each row once, and skip the zero rows (beams that miss the image entirely) since
+    # they do not form any hyperplane
+    if projections is not None:
+        isNonZeroRow = projections.inverseNormsSquared > 0
+    else:
+        rowNormsSquared = row_norms_squared(matrixA)
+        isNonZeroRow = rowNormsSquared > 0
+    if rowOrder is None:
+        nonZeroRows = flatnonzero(isNonZeroRow)
+    else:
+        rowOrder = asarray(rowOrder)
+        nonZeroRows = rowOrder[isNonZeroRow[rowOrder]]
 
-    isLastIteration = False
+    hooks = silentHooks if hooks is None else hooks
+    normB = None
+    if convergenceMonitor is not None:
+        convergenceMonitor.reset()
+        normB = norm(vectorB)
 
     time1 = time()
-    print("Beginning projection algorithm")
+    hooks.phase_started("kaczmarz", iterations=iterations)
+    p = -1
     for p in range(iterations):
         time2 = time()
-        if p == iterations - 1:
-            isLastIteration = True
-        for k in range(numberOfEquations):
-            A = matrixA[k]
-            if isZeroRow(A):
-                continue
-
-            b = vectorB[k]
-            newX = projection_hyperplane(currentX, A, b)
+        if projections is not None:
+            projections.sweep(currentX, vectorB, nonZeroRows, relaxation)
+        else:
+            isLastIteration = p == iterations - 1 or convergenceMonitor is not None
             if isLastIteration:
-                recentIterates.append(newX)
-            currentX = newX
+                recentIterates = []
+            for k in nonZeroRows:
+                if isSparse:
+                    columns, A = matrixA.row(k)
+
+                    # same as projection_hyperplane, restricted to the pixels hit by the beam
+                    projectionFactor = relaxation * (vectorB[k] - dot(A, currentX[columns])) / rowNormsSquared[k]
+                    currentX[columns] += multiply.outer(A, projectionFactor)
+                    if isLastIteration:
+                        recentIterates.append(currentX.copy())
+                    continue
+
+                A = matrixA[k]
+                b = vectorB[k]
+                newX = projection_hyperplane(currentX, A, b, rowNormsSquared[k])
+                if relaxation != 1:
+                    newX = currentX + relaxation*(newX - currentX)
+                if isLastIteration:
+                    recentIterates.append(newX)
+                currentX = newX
+        if constraints is not None:
+            constraints.apply(currentX)
         time3 = time()
-        timeIter = round(time3-time2, 3)
-        print(f"Finished Iteration # {p + 1} out of {iterations} in {timeIter} s")
+
+        residualNorm = None
+        if convergenceMonitor is not None or hooks.wantsResiduals:
+            residualNorm = norm(matrixA @ currentX - vectorB)
+        if finish_iteration(hooks, "kaczmarz", p + 1, iterations, time3 - time2, len(nonZeroRows), residualNorm,
+                            currentX, iterationCallback, convergenceMonitor, normB):
+            break
     time4 = time()
-    timeTotal = round(time4 - time1, 3)
 
-    print(f"Projection algorithm executed in {timeTotal} s \n")
+    hooks.phase_finished("kaczmarz", time4 - time1, iterations=p + 1)
 
     if not returnMultipleIterates:
         return currentX
@@ -0,0 +1,88 @@
+from numpy import asarray, arange, argsort, argmin, argmax, abs, minimum, concatenate, full, inf, ones
+from numpy.random import default_rng
+
+# the orderings in which the views (and rows) of a scan can be visited by the projection algorithms
+rowOrderings = ["natural", "random", "golden", "max_separation", "multilevel"]
+
+def circular_distance(positionsA, positionsB):
+    """Returns the distance between positions on a circle of circumference 1."""
+
+    distance = abs(positionsA - positionsB) % 1
+    return minimum(distance, 1 - distance)
+
+def bit_reversed_order(numberOfItems):
+    """Returns the numbers from 0 to numberOfItems - 1 ordered by the reverse of their binary digits, so that each
+    number is as far as possible from the numbers before it (0, 4, 2, 6, 1, 5, 3, 7 for 8 items)."""
+
+    numberOfBits = max(int(numberOfItems - 1).bit_length(), 1)
+    reversedNumbers = [int(format(k, f"0{numberOfBits}b")[::-1], 2) for k in range(numberOfItems)]
+    return argsort(reversedNumbers, kind="stable")
+
+def view_ordering(viewAngles, ordering: str = "natural", period: float = 180.0, seed=None):
+    """Returns the order in which to visit views placed at the given angles (in degrees), so that consecutive views
+    are far apart and their hyperplanes are far from parallel. Views whose angles differ by a multiple of period are
+    treated as the same direction; for a full turn around the image, views 180 degrees apart trace nearly the same
+    lines.
+
+    The ordering is one of:
+     - "natural" -- the order of the angles
+     - "random" -- a random permutation, drawn with the given seed
+     - "golden" -- each view is the unused view closest to the next multiple of the golden ratio (times the period)
+     - "max_separation" -- each view is the unused view farthest from all of the views visited so far
+     - "multilevel" -- the views are sorted by angle and visited in bit-reversed order, so that each level of views
+     halves the gaps left by the levels before it"""
+
+    if ordering not in rowOrderings:
+        raise Exception(f"Expected ordering to be one of {rowOrderings}; received '{ordering}'.")
+
+    positions = (asarray(viewAngles, float) % period) / period
+    numberOfViews = len(positions)
+
+    if ordering == "natural" or numberOfViews <= 1:
+        return arange(numberOfViews)
+
+    if ordering == "random":
+        return default_rng(seed).permutation(numberOfViews)
+
+    if ordering == "multilevel":
+        return argsort(positions, kind="stable")[bit_reversed_order(numberOfViews)]
+
+    # golden and max_separation pick one unused view at a time
+    isUnused = ones(numberOfViews, bool)
+    order = []
+    if ordering == "golden":
+        goldenFraction = (5 ** 0.5 - 1) / 2
+        for k in range(numberOfViews):
+            distances = circular_distance(positions, (positions[0] + k*goldenFraction) % 1)
+            distances[~isUnused] = inf
+            view = int(argmin(distances))
+            order.append(view)
+            isUnused[view] = False
+    else:
+        # keep the distance from each view to the closest visited view, and visit the farthest view next
+        closestDistances = full(numberOfViews, inf)
+        view = 0
+        for k in range(numberOfViews):
+            order.append(view)
+            isUnused[view] = False
+            closestDistances = minimum(closestDistances, circular_distance(positions, positions[view]))
+            closestDistances[~isUnused] = -inf
+
+            # once every direction was visited, the remaining views repeat them; start over from the last view
+            if closestDistances.max() <= 1e-12:
+                closestDistances = circular_distance(positions, positions[view])
+                closestDistances[~isUnused] = -inf
+            view = int(argmax(closestDistances))
+
+    return asarray(order)
+
+def row_ordering(scanningAngles, numberOfBeams, ordering: str = "natural", seed=None):
+    """Returns the order in which to visit the rows of matrix A of a scan at the given scanning angles, with
+    numberOfBeams rows per direction (view). The "random" ordering permutes all rows; every other ordering visits the
+    views in the order given by view_ordering, and the beams of each view one after another."""
+
+    if ordering == "random":
+        return default_rng(seed).permutation(len(scanningAngles) * numberOfBeams)
+
+    views = view_ordering(scanningAngles, ordering)
+    return concatenate([arange(v*numberOfBeams, (v + 1)*numberOfBeams) for v in views])
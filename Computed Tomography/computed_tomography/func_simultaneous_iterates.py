@@ -0,0 +1,150 @@
+from computed_tomography.cls_sparse_matrix import *
+from computed_tomography.cls_projection_operator import *
+from computed_tomography.cls_convergence_monitor import *
+from computed_tomography.func_row_orderings import *
+from computed_tomography.cls_ct_hooks import *
+from computed_tomography.func_iteration_steps import *
+from numpy import array, asarray, arange, ones, where, concatenate, result_type, float32, float64
+from numpy.linalg import norm
+from time import time
+
+def view_blocks(numberOfDirections, numberOfBeams, numberOfBlocks, ordering: str = "natural", seed=None):
+    """Splits the rows of a scan with the given number of directions (views) and beams per direction into blocks of
+    whole views. Views are dealt to the blocks in turn, so that each block holds views spread around the image.
+
+    The blocks (ordered subsets) are returned in the given ordering (see view_ordering), applied to the angle of the
+    first view of each block; blocks which follow each other then hold views far apart from each other.
+
+    Returns a list of arrays, each containing the row numbers of one block."""
+
+    if not (1 <= numberOfBlocks <= numberOfDirections):
+        raise Exception(f"Expected the number of blocks to be from 1 to {numberOfDirections}; "
+                        f"received {numberOfBlocks}.")
+
+    blocks = []
+    for blockNumber in range(numberOfBlocks):
+        views = arange(blockNumber, numberOfDirections, numberOfBlocks)
+        blocks.append(concatenate([arange(v*numberOfBeams, (v + 1)*numberOfBeams) for v in views]))
+
+    # the first views of the blocks are spread over numberOfBlocks directions, or over half a turn at most
+    blockAngles = arange(numberOfBlocks) * 360 / numberOfDirections
+    period = min(180.0, numberOfBlocks * 360 / numberOfDirections)
+    return [blocks[b] for b in view_ordering(blockAngles, ordering, period, seed)]
+
+def inverse_sums(sums, workingType):
+    """Returns 1 / sums in the given type, with a weight of 0 for sums of 0 (beams which miss the image, pixels which
+    no beam hits), so that their equations and pixels are left alone."""
+    return where(sums > 0, 1 / where(sums > 0, sums, 1), 0.0).astype(workingType)
+
+def simultaneous_iterates(initialX, matrixA, vectorB, iterations, rowBlocks=None, relaxation: float = 1.0,
+                          convergenceMonitor=None, iterationCallback=None, constraints=None,
+                          hooks=None):
+    """Approximates the solution to the linear system matrixA * X = vectorB by projecting the vector initialX on many
+    hyperplanes dot(A, X) = b at once and moving it towards the weighted average of these projections. This process
+    is done for a given number of iterations.
+
+    The rows of matrixA are processed in the blocks given by rowBlocks, a list of arrays of row numbers:
+     - if rowBlocks is None, all rows form one block (Simultaneous Iterative Reconstruction Technique, SIRT)
+     - otherwise, X is updated after each block (Simultaneous Algebraic Reconstruction Technique, SART, which is
+     also known as the ordered subsets method when each block contains several views)
+
+    Assumes initialX and vectorB are arrays, matrixA is an array, a sparse_matrix or a projection_operator, iterations
+    is a positive integer and relaxation is a number from 0 to 2 which scales each update.
+
+    Several systems with the same matrixA can be solved at once by giving initialX and vectorB as 2 dimensional
+    arrays, with one column for each system; every block then updates all of them in one matrix product.
+
+    The column sums of each block weigh the update of every pixel. For a projection_operator split into several
+    blocks they are not kept (which would take one vector the size of the image for every block), but computed
+    again in every sweep, together with the back-projection of the block, from the same traced beams.
+
+    X is updated in the precision of initialX: if initialX (and matrixA) are made of 32-bit floats, so are all the
+    vectors of the iterations, which halves the data each product reads, while the residual norms are still added up
+    in 64-bit floats.
+
+    If a convergence_monitor is given, the residual ||matrixA * X - vectorB|| is reported to it after each iteration,
+    and the algorithm stops before the given number of iterations once the monitor decides that X has converged or
+    stopped improving. The monitor then holds the history of the residuals.
+
+    If constraints (such as a density_constraints) are given, X is projected in place with constraints.project_box(X)
+    after each block and changed with constraints.apply(X) after each iteration, for example to keep it within the
+    range of pixel densities and to regularize it.
+
+    If iterationCallback is given, it is called as iterationCallback(iterationNumber, X) after each iteration, for
+    example to save a checkpoint of X from which an interrupted reconstruction can be resumed (see ct_storage).
+
+    The algorithm runs silently; its progress (the duration of each iteration, the rows processed and the residuals)
+    is reported to hooks, a ct_hooks object such as print_hooks or metrics_collector, under the phase "sirt" (a
+    single block) or "sart"."""
+
+    check_system(initialX, matrixA, vectorB)
+    vectorDimension = initialX.shape[0]
+    numberOfEquations = matrixA.shape[0]
+
+    if rowBlocks is None:
+        rowBlocks = [arange(numberOfEquations)]
+
+    workingType = result_type(initialX, float32)
+
+    # the column sums of the blocks of a projection_operator are computed in every sweep (None), rather than kept
+    doKeepColumnSums = not (isinstance(matrixA, projection_operator) and len(rowBlocks) > 1)
+
+    # Prepare each block once: its rows, its part of vectorB, and the inverse row sums and column sums of the block,
+    # which weigh the residual of every equation and the update of every pixel.
+    blocks = []
+    for rowNumbers in rowBlocks:
+        if hasattr(matrixA, "take_rows"):
+            blockA = matrixA.take_rows(rowNumbers)
+        else:
+            blockA = matrixA[rowNumbers]
+        inverseRowSums = inverse_sums(blockA @ ones(vectorDimension), workingType)
+        inverseColumnSums = inverse_sums(ones(blockA.shape[0]) @ blockA, workingType) if doKeepColumnSums else None
+        if vectorB.ndim == 2:
+            inverseRowSums = inverseRowSums[:, None]
+            if inverseColumnSums is not None:
+                inverseColumnSums = inverseColumnSums[:, None]
+        blocks.append((blockA, asarray(vectorB[rowNumbers], workingType), inverseRowSums, inverseColumnSums))
+
+    currentX = array(initialX, workingType)
+    hooks = silentHooks if hooks is None else hooks
+    phase = "sirt" if len(blocks) == 1 else "sart"
+    rowsPerIteration = sum(blockA.shape[0] for blockA, _, _, _ in blocks)
+    normB = None
+    if convergenceMonitor is not None:
+        convergenceMonitor.reset()
+        normB = norm(vectorB)
+
+    time1 = time()
+    hooks.phase_started(phase, iterations=iterations, blocks=len(blocks))
+    p = -1
+    for p in range(iterations):
+        time2 = time()
+        for blockA, blockB, inverseRowSums, inverseColumnSums in blocks:
+            weightedResiduals = inverseRowSums * (blockB - blockA @ currentX)
+            if inverseColumnSums is not None:
+                currentX += relaxation * inverseColumnSums * (weightedResiduals.T @ blockA).T
+            else:
+                # back-project the residuals and a column of ones at once, which gives the column sums of the block
+                stackedY = concatenate((weightedResiduals.reshape((blockA.shape[0], -1)),
+                                        ones((blockA.shape[0], 1), workingType)), axis=1)
+                backProjection = (stackedY.T @ blockA).T
+                blockInverseColumnSums = inverse_sums(backProjection[:, -1], workingType)
+                currentX += relaxation * (blockInverseColumnSums[:, None] *
+                                          backProjection[:, :-1]).reshape(currentX.shape)
+            if constraints is not None:
+                constraints.project_box(currentX)
+        if constraints is not None:
+            constraints.apply(currentX)
+        time3 = time()
+
+        residualNorm = None
+        if convergenceMonitor is not None or hooks.wantsResiduals:
+            residualNorm = norm(asarray(matrixA @ currentX, float64) - vectorB)
+        if finish_iteration(hooks, phase, p + 1, iterations, time3 - time2, rowsPerIteration, residualNorm, currentX,
+                            iterationCallback, convergenceMonitor, normB):
+            break
+    time4 = time()
+
+    hooks.phase_finished(phase, time4 - time1, iterations=p + 1)
+
+    return currentX
@@ -0,0 +1,203 @@
+from computed_tomography.cls_projection_operator import *
+from numpy import vstack, array_split, arange, zeros, array, int64, float32, float64
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+
+# the pixel grid and beam array of the scan, set once in each worker process of a parallel build
+workerGeometry = {}
+
+def matrix_type(dtype):
+    """Returns the type (float64 or float32) matrix A is stored as for a dtype given in any form numpy accepts, such
+    as float32, "float32", numpy.dtype("float32") or float (which is float64), or raises an exception for any other
+    type."""
+
+    try:
+        scalarType = numpy.dtype(dtype).type
+    except TypeError:
+        scalarType = None
+    if scalarType not in [float64, float32]:
+        raise Exception(f"Expected dtype to be float64 or float32; received {dtype}.")
+    return scalarType
+
+def set_worker_geometry(pixelGrid, beamArray, projectionModel):
+    """Keeps a copy of the scan geometry in a worker process, so that it is sent to each worker only once."""
+
+    workerGeometry["pixelGrid"] = pixelGrid
+    workerGeometry["beamArray"] = beamArray
+    workerGeometry["projectionModel"] = projectionModel
+
+def system_submatrix(pixelGrid, beamArray, scanningAngles, matrixFormat: str = "dense",
+                     projectionModel: str = "center_line", dtype=float64):
+    """Returns the rows of matrix A for the beam array placed at each of the given scanning angles in turn, without
+    rotating the beam array itself. The coefficients are traced in 64-bit floats and stored as the given dtype."""
+
+    submatricesA = []
+    for scanAngle in scanningAngles:
+        if matrixFormat == "sparse":
+            submatrixA = pixelGrid.coefficient_sparse_array(beamArray, scanAngle, projectionModel)
+            submatrixA.data = submatrixA.data.astype(dtype, copy=False)
+        else:
+            submatrixA = pixelGrid.coefficient_array(beamArray, scanAngle, projectionModel).astype(dtype, copy=False)
+        submatricesA.append(submatrixA)
+
+    if matrixFormat == "sparse":
+        return sparse_matrix.vstack(submatricesA)
+    return vstack(tuple(submatricesA))
+
+def worker_system_submatrix(scanningAngles, matrixFormat, dtype):
+    """Returns system_submatrix for the scan geometry kept in a worker process."""
+    return system_submatrix(workerGeometry["pixelGrid"], workerGeometry["beamArray"], scanningAngles, matrixFormat,
+                            workerGeometry["projectionModel"], dtype)
+
+def view_symmetries(pixelGrid, beamArray, scanningAngles):
+    """Finds which directions (views) of a scan are mirror images or rotations of earlier views about the center of
+    the image, so that their rows of matrix A can be found by rearranging the rows of those views.
+
+    Rotating a beam array by 180 degrees rotates all of its beams about the center of the image, which moves every
+    pixel to another pixel; on a square image, so does rotating it by 90 or 270 degrees. Placing the beam array at
+    the negative of its central angle mirrors all of its beams across the horizontal line through the center, which
+    also reverses the order of its beams; this is only a symmetry of the scan if the beam array is its own mirror
+    image (see beam_array.is_mirror_symmetric), so mirrored views are only used for such beam arrays.
+
+    A grid whose center is not the center of its pixels (see pixel_grid.downsampled) has no such symmetries, and all
+    of its views are fundamental.
+
+    Returns the scanning angles of the fundamental views which need to be traced, and three arrays telling for each
+    view the fundamental view it comes from, the number of quarter turns (0 to 3) it is rotated by and whether it is
+    mirrored first."""
+
+    isSquare = pixelGrid.imageWidth == pixelGrid.imageHeight
+    quarterTurns = [0, 1, 2, 3] if isSquare else [0, 2]
+    mirrorings = [False, True] if beamArray.is_mirror_symmetric() else [False]
+    if not pixelGrid.is_centered():
+        quarterTurns, mirrorings = [0], [False]
+
+    fundamentalAngles = []
+    sourceViews, rotations, mirrors = [], [], []
+    knownAngles = {}
+    for scanAngle in scanningAngles:
+        angleKey = round(float(scanAngle) % 360, 6) % 360
+        if angleKey not in knownAngles:
+            # a new fundamental view, whose images under every symmetry can be found without tracing
+            fundamentalAngles.append(scanAngle)
+            for isMirrored in mirrorings:
+                for quarterTurn in quarterTurns:
+                    imageAngle = (-scanAngle if isMirrored else scanAngle) + 90*quarterTurn
+                    imageKey = round(float(imageAngle) % 360, 6) % 360
+                    if imageKey not in knownAngles:
+                        knownAngles[imageKey] = (len(fundamentalAngles) - 1, quarterTurn, isMirrored)
+
+        sourceView, quarterTurn, isMirrored = knownAngles[angleKey]
+        sourceViews.append(sourceView)
+        rotations.append(quarterTurn)
+        mirrors.append(isMirrored)
+
+    return array(fundamentalAngles, float), array(sourceViews, int64), array(rotations, int64), array(mirrors, bool)
+
+def symmetric_pixel_numbers(imageWidth, imageHeight, quarterTurns, isMirrored):
+    """Returns an array telling, for each pixel number, the pixel number it is moved to when the image is mirrored
+    across its horizontal center line (if isMirrored) and then turned clockwise by a number of quarter turns."""
+
+    pixelX, pixelY = arange(imageWidth*imageHeight) % imageWidth, arange(imageWidth*imageHeight) // imageWidth
+    if isMirrored:
+        pixelY = imageHeight - 1 - pixelY
+    if quarterTurns % 2 == 0:
+        # a half turn about the center moves the pixel (j, i) to (width - 1 - j, height - 1 - i)
+        for q in range(quarterTurns // 2):
+            pixelX, pixelY = imageWidth - 1 - pixelX, imageHeight - 1 - pixelY
+    else:
+        # a quarter turn about the center moves the pixel (j, i) of a square image to (width - 1 - i, j)
+        for q in range(quarterTurns):
+            pixelX, pixelY = imageWidth - 1 - pixelY, pixelX
+
+    return pixelX + pixelY*imageWidth
+
+def expand_symmetric_views(fundamentalMatrix, imageWidth, imageHeight, numberOfBeams, sourceViews, rotations,
+                           mirrors):
+    """Returns the full matrix A of a scan (an array or a sparse_matrix, like fundamentalMatrix) from the rows of its
+    fundamental views, by rearranging the rows and pixels of a fundamental view for every view which is one of its
+    mirror images or rotations (see view_symmetries)."""
+
+    isSparse = isinstance(fundamentalMatrix, sparse_matrix)
+    pixelNumbers = {}
+    submatricesA = []
+    for sourceView, quarterTurns, isMirrored in zip(sourceViews, rotations, mirrors):
+        # mirroring the beam array reverses the order of its beams
+        beamOrder = arange(numberOfBeams)[::-1] if isMirrored else arange(numberOfBeams)
+        rows = sourceView*numberOfBeams + beamOrder
+
+        symmetry = (int(quarterTurns), bool(isMirrored))
+        if symmetry not in pixelNumbers:
+            pixelNumbers[symmetry] = symmetric_pixel_numbers(imageWidth, imageHeight, *symmetry)
+        movedPixelNumbers = pixelNumbers[symmetry]
+
+        if isSparse:
+            submatrixA = fundamentalMatrix.take_rows(rows)
+            submatrixA.indices = movedPixelNumbers[submatrixA.indices].astype(submatrixA.indices.dtype)
+        else:
+            submatrixA = zeros((numberOfBeams, fundamentalMatrix.shape[1]), fundamentalMatrix.dtype)
+            submatrixA[:, movedPixelNumbers] = fundamentalMatrix[rows]
+        submatricesA.append(submatrixA)
+
+    if isSparse:
+        return sparse_matrix.vstack(submatricesA)
+    return vstack(tuple(submatricesA))
+
+def compact_system_matrix(pixelGrid, beamArray, scanningAngles, matrixFormat: str = "dense",
+                          numberOfWorkers: int = None, projectionModel: str = "center_line", dtype=float64):
+    """Returns the rows of matrix A for the fundamental views of a scan only (see view_symmetries), together with
+    the arrays (sourceViews, rotations, mirrors) and the tuple (image width, image height, number of beams) which
+    expand_symmetric_views needs to rebuild the full matrix."""
+
+    fundamentalAngles, sourceViews, rotations, mirrors = view_symmetries(pixelGrid, beamArray, scanningAngles)
+    fundamentalMatrix = system_matrix(pixelGrid, beamArray, fundamentalAngles, matrixFormat, numberOfWorkers,
+                                      doUseSymmetry=False, projectionModel=projectionModel, dtype=dtype)
+    geometry = (pixelGrid.imageWidth, pixelGrid.imageHeight, beamArray.numberOfBeams)
+    return fundamentalMatrix, (sourceViews, rotations, mirrors), geometry
+
+def system_matrix(pixelGrid, beamArray, scanningAngles, matrixFormat: str = "dense", numberOfWorkers: int = None,
+                  doUseSymmetry: bool = True, projectionModel: str = "center_line", dtype=float64):
+    """Returns the matrix A of a scan where the beam array is placed at each of the scanning angles around the pixel
+    grid in turn. Each row holds the coefficients of one beam in one direction, and the rows are ordered by
+    direction, then by beam.
+
+    The matrix is stored according to matrixFormat, which is either "dense", "sparse" or "operator" (see
+    CAT_Scanner.scan), and its coefficients are computed with the given projection model, either "center_line" or
+    "strip" (see pixel_grid.trace_beams). Dense and sparse matrices store their coefficients as the given dtype,
+    float64 or float32; 32-bit coefficients halve the memory of matrix A and the data read by each product with it.
+
+    If numberOfWorkers is given, the directions are split into that many groups whose rows are built at the same
+    time by a pool of worker processes, each with its own copy of the pixel grid and the beam array. Since worker
+    processes import the calling program again on some systems (such as Windows), programs building matrices this
+    way should run under an  if __name__ == "__main__":  block.
+
+    If doUseSymmetry is True, only the views which are not mirror images or rotations of other views are traced,
+    and the rows of the others are found by rearranging theirs (see view_symmetries)."""
+
+    if matrixFormat not in ["dense", "sparse", "operator"]:
+        raise Exception(f"Expected matrixFormat to be 'dense', 'sparse' or 'operator'; received '{matrixFormat}'.")
+
+    dtype = matrix_type(dtype)
+
+    if matrixFormat == "operator":
+        return projection_operator(pixelGrid, beamArray, scanningAngles, projectionModel)
+
+    if doUseSymmetry:
+        fundamentalMatrix, symmetries, geometry = compact_system_matrix(pixelGrid, beamArray, scanningAngles,
+                                                                        matrixFormat, numberOfWorkers,
+                                                                        projectionModel, dtype)
+        return expand_symmetric_views(fundamentalMatrix, *geometry, *symmetries)
+
+    if numberOfWorkers is None or numberOfWorkers <= 1 or len(scanningAngles) <= 1:
+        return system_submatrix(pixelGrid, beamArray, scanningAngles, matrixFormat, projectionModel, dtype)
+
+    # each worker builds the rows of a consecutive group of directions, so the groups stack back in order
+    angleGroups = [angles for angles in array_split(array(scanningAngles, float), numberOfWorkers) if len(angles)]
+    with ProcessPoolExecutor(numberOfWorkers, initializer=set_worker_geometry,
+                             initargs=(pixelGrid, beamArray, projectionModel)) as executor:
+        submatricesA = list(executor.map(worker_system_submatrix, angleGroups, [matrixFormat]*len(angleGroups),
+                                         [dtype]*len(angleGroups)))
+
+    if matrixFormat == "sparse":
+        return sparse_matrix.vstack(submatricesA)
+    return vstack(tuple(submatricesA))
@@ -0,0 +1,6 @@
+from computed_tomography.func_krylov_iterates import cgls_iterates, lsqr_iterates
+
+# the least squares solvers which CAT_Scanner.reconstruct_densities can use by name besides its own methods. Each is
+# called as solver(initialX, matrixA, vectorB, iterations, convergenceMonitor, iterationCallback, hooks) and returns
+# the reconstructed densities; other solvers with the same signature may be added under new names.
+linearSolvers = {"cgls": cgls_iterates, "lsqr": lsqr_iterates}
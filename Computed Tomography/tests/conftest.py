@@ -0,0 +1,8 @@
+import os
+import sys
+
+# run the tests against the package next to this folder, and make the fast_fourier_transform package (needed by
+# filtered back-projection) importable when the repository is laid out as usual
+testFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(testFolder))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(testFolder)), "Fast Fourier Transform"))
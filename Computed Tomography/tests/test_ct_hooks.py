@@ -0,0 +1,29 @@
+import tracemalloc
+from computed_tomography import *
+
+
+def test_memory_tracing_stops_after_the_outermost_phase():
+    hooks = metrics_collector(doTrackMemory=True)
+    hooks.phase_started("reconstruct")
+    hooks.phase_started("sart")
+    hooks.phase_finished("sart", 0.0)
+    assert tracemalloc.is_tracing()
+    hooks.phase_finished("reconstruct", 0.0)
+    assert not tracemalloc.is_tracing() and hooks.peakTracedMemory > 0
+
+def test_clear_stops_the_tracing_of_an_interrupted_run():
+    hooks = metrics_collector(doTrackMemory=True)
+    hooks.phase_started("sart")
+    hooks.clear()
+    assert not tracemalloc.is_tracing() and hooks.openPhases == 0
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        hooks = metrics_collector(doTrackMemory=True)
+        hooks.phase_started("sart")
+        hooks.phase_finished("sart", 0.0)
+        hooks.clear()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
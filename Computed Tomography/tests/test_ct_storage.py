@@ -0,0 +1,118 @@
+import pytest
+from computed_tomography import *
+from computed_tomography.func_phantoms import phantom_image, shepp_logan_phantom, disk_phantom
+from numpy import arange, array_equal, allclose
+
+
+def test_save_array_round_trip(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    savedArray = storage.save_array("x", arange(12.0).reshape((3, 4)))
+
+    assert array_equal(savedArray, arange(12.0).reshape((3, 4)))
+    assert array_equal(storage.load_array("x"), arange(12.0).reshape((3, 4)))
+
+def test_save_array_keeps_its_own_memory_mapped_source(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    mappedArray = storage.create_array("x", (3, 4))
+    mappedArray[...] = arange(12.0).reshape((3, 4))
+
+    # saving an array under the name of the file it is mapped from must not truncate that file
+    savedArray = storage.save_array("x", mappedArray)
+    assert array_equal(mappedArray, arange(12.0).reshape((3, 4)))
+    assert array_equal(savedArray, arange(12.0).reshape((3, 4)))
+    assert array_equal(storage.load_array("x"), arange(12.0).reshape((3, 4)))
+
+    # the same holds for an array loaded from the storage, or a part of it
+    loadedArray = storage.load_array("x")
+    storage.save_array("x", loadedArray)
+    assert array_equal(storage.load_array("x"), arange(12.0).reshape((3, 4)))
+    storage.save_array("x", loadedArray[1:])
+    assert array_equal(loadedArray, arange(12.0).reshape((3, 4)))
+    assert array_equal(storage.load_array("x"), arange(4.0, 12.0).reshape((2, 4)))
+
+def test_create_array_keeps_earlier_arrays_of_the_same_name(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    earlierArray = storage.save_array("x", arange(5.0))
+    newArray = storage.create_array("x", (2,))
+
+    assert array_equal(earlierArray, arange(5.0))
+    assert array_equal(newArray, [0.0, 0.0])
+
+    # the earlier array no longer belongs to the file, so saving it writes its values again
+    storage.save_array("x", earlierArray)
+    assert array_equal(storage.load_array("x"), arange(5.0))
+
+def test_copy_on_write_arrays_are_written_to_the_file(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    storage.save_array("x", arange(5.0))
+    copiedArray = storage.load_array("x", "c")
+    copiedArray[0] = -1
+
+    storage.save_array("x", copiedArray)
+    assert array_equal(storage.load_array("x"), [-1.0, 1.0, 2.0, 3.0, 4.0])
+
+
+class interrupting_hooks(ct_hooks):
+    """Hooks which interrupt a reconstruction after a given iteration, before its checkpoint is saved."""
+
+    def __init__(self, interruptedIteration):
+        self.interruptedIteration = interruptedIteration
+        self.messages = []
+
+    def iteration_finished(self, phase, iteration, iterations, seconds, rowsProcessed, residualNorm=None):
+        if iteration == self.interruptedIteration:
+            raise KeyboardInterrupt
+
+    def message(self, text):
+        self.messages.append(text)
+
+def make_scanner(densities, hooks=None):
+    scanner = CAT_Scanner(phantom_image(densities), beam_array_parallel(24, 80, 1), hooks=hooks)
+    scanner.scan(12, "sparse")
+    return scanner
+
+def interrupt_reconstruction(storage, densities, **settings):
+    scanner = make_scanner(densities, interrupting_hooks(3))
+    with pytest.raises(KeyboardInterrupt):
+        scanner.reconstruct_densities(5, "sart", storage=storage, **settings)
+
+def test_interrupted_reconstruction_resumes_from_its_checkpoint(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    densities = shepp_logan_phantom(16, 16)
+    interrupt_reconstruction(storage, densities)
+
+    resumingHooks = interrupting_hooks(None)
+    resumedX = make_scanner(densities, resumingHooks).reconstruct_densities(5, "sart", storage=storage)
+    assert resumingHooks.messages == ["Resuming the reconstruction after iteration # 2"]
+    assert allclose(resumedX, make_scanner(densities).reconstruct_densities(5, "sart"))
+
+@pytest.mark.parametrize("changedSettings", [{"relaxation": 0.5}, {"ordering": "golden"}, {"image": True}])
+def test_checkpoints_of_other_reconstructions_are_ignored(tmp_path, changedSettings):
+    storage = ct_storage(str(tmp_path))
+    densities = shepp_logan_phantom(16, 16)
+    interrupt_reconstruction(storage, densities)
+
+    settings = {name: value for name, value in changedSettings.items() if name != "image"}
+    if "image" in changedSettings:
+        densities = disk_phantom(16, 16)
+    resumingHooks = interrupting_hooks(None)
+    reconstructedX = make_scanner(densities, resumingHooks).reconstruct_densities(5, "sart", storage=storage,
+                                                                                   **settings)
+    assert resumingHooks.messages == []
+    assert allclose(reconstructedX, make_scanner(densities).reconstruct_densities(5, "sart", **settings))
+
+def test_seeded_random_orderings_resume_exactly(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    densities = shepp_logan_phantom(16, 16)
+    settings = {"numberOfBlocks": 4, "ordering": "random", "seed": 7}
+    interrupt_reconstruction(storage, densities, **settings)
+
+    resumingHooks = interrupting_hooks(None)
+    resumedX = make_scanner(densities, resumingHooks).reconstruct_densities(5, "sart", storage=storage, **settings)
+    assert resumingHooks.messages == ["Resuming the reconstruction after iteration # 2"]
+    assert allclose(resumedX, make_scanner(densities).reconstruct_densities(5, "sart", **settings))
+
+    otherSeedHooks = interrupting_hooks(None)
+    make_scanner(densities, otherSeedHooks).reconstruct_densities(5, "sart", storage=storage,
+                                                                  **{**settings, "seed": 8})
+    assert otherSeedHooks.messages == []
@@ -0,0 +1,33 @@
+import pytest
+from computed_tomography import *
+from computed_tomography.func_phantoms import phantom_image, shepp_logan_phantom
+from numpy import linspace, zeros, full, allclose
+
+pytest.importorskip("fast_fourier_transform")
+
+
+def scan_phantom(beamArray, numberOfDirections=60):
+    scanner = CAT_Scanner(phantom_image(shepp_logan_phantom(32, 32)), beamArray)
+    scanner.scan(numberOfDirections, "operator")
+    return scanner
+
+def test_plain_beam_arrays_are_rebinned_from_their_angles():
+    parallelX = scan_phantom(beam_array_parallel(48, 90, 1)).reconstruct_densities(method="fbp")
+
+    # the same beams as a plain beam array, listed in reverse order
+    plainArray = beam_array(linspace(45, -45, 48), zeros(48), 1)
+    assert allclose(scan_phantom(plainArray).reconstruct_densities(method="fbp"), parallelX, rtol=0, atol=1e-9)
+
+def test_irregular_beam_arrays_are_rejected():
+    scanner = scan_phantom(beam_array([0, 10, 25], [0, 5, -3], 1), 12)
+    with pytest.raises(Exception, match="Filtered back-projection needs a beam array"):
+        scanner.reconstruct_densities(method="fbp")
+
+def test_uniform_phantom_is_reconstructed_evenly():
+    scanner = CAT_Scanner(phantom_image(full((32, 32), 5.0)), beam_array_parallel(64, 90, 1))
+    scanner.scan(64, "operator")
+    imageX = scanner.reconstruct_densities(method="fbp").reshape((32, 32))
+
+    # away from the edges of the square, where the filter rings, every pixel has nearly the density of the phantom
+    assert abs(imageX[8:-8, 8:-8] - 5).max() < 0.3
+    assert abs(imageX.mean() - 5) < 0.1
@@ -0,0 +1,73 @@
+import pytest
+from computed_tomography import *
+from computed_tomography.func_row_orderings import rowOrderings
+from numpy import allclose, arange, array_equal, concatenate, diff, full, sort, zeros
+from numpy.linalg import norm
+
+
+def scanned_phantom(numberOfDirections=12):
+    scanner = CAT_Scanner(phantom_image(shepp_logan_phantom(16, 16)), beam_array_parallel(24, 80, 1))
+    scanner.scan(numberOfDirections, "sparse")
+    return scanner
+
+@pytest.mark.parametrize("solver", [cgls_iterates, lsqr_iterates])
+def test_krylov_residuals_decrease(solver):
+    scanner = scanned_phantom()
+    hooks = metrics_collector()
+    solver(zeros(scanner.numberOfPixels), scanner.matrixA, scanner.vectorB, 10, hooks=hooks)
+
+    residuals = hooks.residual_norms()
+    assert len(residuals) == 10
+    assert all(diff(residuals) <= 1e-9 * residuals[0])
+    assert residuals[-1] < 0.2 * norm(scanner.vectorB)
+
+@pytest.mark.parametrize("ordering", rowOrderings)
+def test_orderings_visit_every_row_once(ordering):
+    scanningAngles = arange(12) * 30.0
+    assert array_equal(sort(view_ordering(scanningAngles, ordering, seed=3)), arange(12))
+    assert array_equal(sort(row_ordering(scanningAngles, 5, ordering, seed=3)), arange(60))
+
+    rowBlocks = view_blocks(12, 5, 4, ordering, seed=3)
+    assert len(rowBlocks) == 4 and array_equal(sort(concatenate(rowBlocks)), arange(60))
+
+def test_random_orderings_follow_their_seed():
+    scanningAngles = arange(12) * 30.0
+    assert array_equal(row_ordering(scanningAngles, 5, "random", 3), row_ordering(scanningAngles, 5, "random", 3))
+    assert not array_equal(row_ordering(scanningAngles, 5, "random", 3), row_ordering(scanningAngles, 5, "random", 4))
+
+def test_orderings_spread_the_first_views():
+    # the first two views are (nearly) perpendicular, rather than the neighbours of the natural order
+    scanningAngles = arange(12) * 15.0
+    for ordering in ["golden", "max_separation", "multilevel"]:
+        firstViews = scanningAngles[view_ordering(scanningAngles, ordering)[:2]]
+        assert abs(abs(firstViews[1] - firstViews[0]) - 90) <= 30, ordering
+
+def test_unknown_orderings_are_rejected():
+    with pytest.raises(Exception, match="Expected ordering to be one of"):
+        view_ordering(arange(4) * 45.0, "spiral")
+
+def test_constraints_keep_the_densities_in_their_bounds():
+    densities = full((4, 4), 20.0)
+    densities[0, 0] = -3
+    constraints = density_constraints(4, 4, tikhonovWeight=1.0)
+    constrainedX = constraints.apply(densities.flatten())
+    assert constrainedX.min() == 0 and constrainedX.max() == 10
+
+    # Tikhonov regularization halves the densities with a weight of 1 before they are clipped
+    assert allclose(density_constraints(4, 4, upperBound=None, tikhonovWeight=1.0).apply(densities.flatten())[1:], 10)
+
+def test_total_variation_smooths_noise():
+    scanner = scanned_phantom()
+    noisyX = scanner.density_vector() + 0.5 * (arange(scanner.numberOfPixels) % 2)
+    constraints = density_constraints(16, 16, lowerBound=None, upperBound=None, tvWeight=0.1)
+    smoothedX = constraints.apply(noisyX.copy())
+
+    imageX = smoothedX.reshape((16, 16))
+    noisyImageX = noisyX.reshape((16, 16))
+    assert abs(diff(imageX, axis=1)).sum() < abs(diff(noisyImageX, axis=1)).sum()
+
+@pytest.mark.parametrize("method", ["kaczmarz", "sart"])
+def test_constrained_reconstructions_stay_in_bounds(method):
+    scanner = scanned_phantom()
+    reconstructedX = scanner.reconstruct_densities(3, method, constraints=density_constraints(16, 16, 1.0, 4.0))
+    assert reconstructedX.min() >= 1.0 and reconstructedX.max() <= 4.0
@@ -0,0 +1,46 @@
+import pytest
+from computed_tomography import *
+from numpy import allclose, zeros
+from numpy.random import default_rng
+
+
+def random_matrix(numberOfRows, numberOfColumns, seed=0):
+    # a dense matrix with about a fifth of its entries nonzero, and one zero row
+    rng = default_rng(seed)
+    denseA = rng.random((numberOfRows, numberOfColumns)) * (rng.random((numberOfRows, numberOfColumns)) < 0.2)
+    denseA[1] = 0
+    return denseA
+
+@pytest.mark.parametrize("numberOfSystems", [None, 3])
+def test_products_match_dense_products(numberOfSystems):
+    denseA = random_matrix(12, 9)
+    matrixA = sparse_matrix.from_dense(denseA)
+    rng = default_rng(1)
+    vectorX = rng.random(9 if numberOfSystems is None else (9, numberOfSystems))
+    vectorY = rng.random(12 if numberOfSystems is None else (12, numberOfSystems))
+
+    assert allclose(matrixA.dot(vectorX), denseA @ vectorX)
+    assert allclose(matrixA.transpose_dot(vectorY), denseA.T @ vectorY)
+    assert allclose(matrixA @ vectorX, denseA @ vectorX)
+    assert allclose(vectorY.T @ matrixA, vectorY.T @ denseA)
+
+def test_take_rows_matches_dense_rows():
+    denseA = random_matrix(12, 9)
+    rowNumbers = [7, 1, 1, 0, 11]
+    assert allclose(sparse_matrix.from_dense(denseA).take_rows(rowNumbers).to_dense(), denseA[rowNumbers])
+    assert sparse_matrix.from_dense(denseA).take_rows([]).shape == (0, 9)
+
+@pytest.mark.parametrize("relaxation", [1.0, 0.5])
+def test_sweep_matches_projections_on_each_hyperplane(relaxation):
+    denseA = random_matrix(12, 9)
+    vectorB = default_rng(2).random(12)
+    rowOrder = [5, 0, 11, 3, 7]
+
+    expectedX = zeros(9)
+    for k in rowOrder:
+        projectedX = projection_hyperplane(expectedX, denseA[k], vectorB[k])
+        expectedX = expectedX + relaxation * (projectedX - expectedX)
+
+    currentX = zeros(9)
+    projection_set(denseA).sweep(currentX, vectorB, rowOrder, relaxation)
+    assert allclose(currentX, expectedX)
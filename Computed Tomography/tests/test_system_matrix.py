@@ -0,0 +1,113 @@
+import pytest
+from computed_tomography import *
+from numpy import linspace, allclose, dtype, float32, float64
+
+
+def make_beam_array(mode, numberOfBeams, spreadAngle):
+    if mode == "parallel":
+        return beam_array_parallel(numberOfBeams, spreadAngle, 1)
+    if mode == "fan":
+        return beam_array_fan_mode(numberOfBeams, spreadAngle, 1)
+    # beams which are not spread symmetrically, so that the beam array is not its own mirror image
+    return beam_array(linspace(-spreadAngle/2, spreadAngle/4, numberOfBeams),
+                      linspace(-spreadAngle/8, spreadAngle/16, numberOfBeams)**2 / 10, 1)
+
+@pytest.mark.parametrize("mode", ["parallel", "fan", "asymmetric"])
+@pytest.mark.parametrize("projectionModel", ["center_line", "strip"])
+@pytest.mark.parametrize("imageSize", [(9, 9), (8, 8), (10, 7), (5, 12)])
+def test_symmetric_views_match_direct_tracing(mode, projectionModel, imageSize):
+    pixelGrid = pixel_grid(*imageSize)
+    scanningAngles = linspace(0, 360, 12, endpoint=False)
+    for numberOfBeams in [3, 4, 7, 8, 16]:
+        for spreadAngle in [60, 80, 90]:
+            beamArray = make_beam_array(mode, numberOfBeams, spreadAngle)
+            symmetricA = system_matrix(pixelGrid, beamArray, scanningAngles, "dense", doUseSymmetry=True,
+                                       projectionModel=projectionModel)
+            tracedA = system_matrix(pixelGrid, beamArray, scanningAngles, "dense", doUseSymmetry=False,
+                                    projectionModel=projectionModel)
+            assert allclose(symmetricA, tracedA, rtol=0, atol=1e-9), (numberOfBeams, spreadAngle)
+
+def test_asymmetric_beam_array_matches_direct_tracing():
+    pixelGrid = pixel_grid(9, 9)
+    beamArray = beam_array([0, 10, 25], [0, 5, -3], 1)
+    scanningAngles = linspace(0, 360, 12, endpoint=False)
+    assert not beamArray.is_mirror_symmetric()
+    assert beam_array_parallel(7, 80, 1).is_mirror_symmetric() and beam_array_fan_mode(7, 80, 1).is_mirror_symmetric()
+
+    symmetricA = system_matrix(pixelGrid, beamArray, scanningAngles, "dense", doUseSymmetry=True)
+    tracedA = system_matrix(pixelGrid, beamArray, scanningAngles, "dense", doUseSymmetry=False)
+    assert allclose(symmetricA, tracedA, rtol=0, atol=1e-9)
+
+def test_lines_on_the_edge_of_the_image_keep_half_their_length():
+    # on a 9 x 9 grid, the outer beams of 7 beams spread over 90 degrees lie on the edges of the image at 90 degrees,
+    # and each of them keeps half of its length in the pixels along its edge
+    matrixA = system_matrix(pixel_grid(9, 9), beam_array_parallel(7, 90, 1), [90], "dense", doUseSymmetry=False)
+    columnSums = matrixA.reshape((7, 9, 9)).sum(axis=1)
+    assert allclose(columnSums[0], columnSums[6][::-1])
+    assert allclose(sorted([columnSums[0][0], columnSums[0][-1]]), [0, 4.5])
+    assert allclose(matrixA[1:6].sum(axis=1), 9)
+
+def test_sparse_matrix_matches_projection_operator():
+    pixelGrid = pixel_grid(9, 9)
+    beamArray = beam_array_parallel(7, 90, 1)
+    scanningAngles = linspace(0, 360, 8, endpoint=False)
+    operatorA = system_matrix(pixelGrid, beamArray, scanningAngles, "operator")
+    sparseA = system_matrix(pixelGrid, beamArray, scanningAngles, "sparse")
+    assert allclose(operatorA.to_sparse().to_dense(), sparseA.to_dense(), rtol=0, atol=1e-9)
+
+def test_cache_keys_follow_the_angles_of_the_beams():
+    parallelArray = beam_array_parallel(16, 60, 1)
+    sameBeams = beam_array(linspace(-30, 30, 16), [0]*16, 1)
+    fanArray = beam_array_fan_mode(16, 60, 1)
+
+    keys = [system_matrix_cache.geometry_key(16, 16, beamArray, 12, "sparse")
+            for beamArray in [parallelArray, sameBeams, fanArray]]
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+    assert system_matrix_cache.geometry_key(16, 16, beam_array_parallel(16, 60, 2), 12, "sparse") != keys[0]
+
+def test_beam_arrays_show_their_spread_angle_only_if_they_have_one():
+    plainRepr = repr(beam_array(linspace(-30, 30, 16), [0]*16, 1))
+    assert plainRepr.startswith("beam_array(numberOfBeams=16,") and "spreadAngle" not in plainRepr
+    assert "spreadAngle=60" in repr(beam_array_parallel(16, 60, 1))
+    assert "spreadAngle=60" in repr(beam_array_fan_mode(16, 60, 1))
+
+@pytest.mark.parametrize("dtype, expectedType", [(float32, float32), ("float32", float32), (dtype("float32"), float32),
+                                                 (float, float64), ("float64", float64)])
+def test_dtype_may_be_given_in_any_form(dtype, expectedType):
+    matrixA = system_matrix(pixel_grid(8, 8), beam_array_parallel(8, 80, 1), [0, 90], "sparse", dtype=dtype)
+    assert matrixA.data.dtype == expectedType
+    assert system_matrix_cache.geometry_key(8, 8, beam_array_parallel(8, 80, 1), 2, "sparse", dtype=dtype) == \
+        system_matrix_cache.geometry_key(8, 8, beam_array_parallel(8, 80, 1), 2, "sparse", dtype=expectedType)
+
+@pytest.mark.parametrize("dtype", ["float16", int, "nonsense"])
+def test_other_dtypes_are_rejected(dtype):
+    with pytest.raises(Exception, match="Expected dtype"):
+        system_matrix(pixel_grid(8, 8), beam_array_parallel(8, 80, 1), [0, 90], "sparse", dtype=dtype)
+
+def test_cache_drops_the_matrices_used_least_recently(tmp_path):
+    matrixCache = system_matrix_cache(str(tmp_path), maxMatricesInMemory=2)
+    beamArray = beam_array_parallel(8, 80, 1)
+    builtDirections = []
+
+    def build_matrix(numberOfDirections):
+        builtDirections.append(numberOfDirections)
+        scanningAngles = linspace(0, 360, numberOfDirections, endpoint=False)
+        return system_matrix(pixel_grid(8, 8), beamArray, scanningAngles, "sparse")
+
+    keys = {n: system_matrix_cache.geometry_key(8, 8, beamArray, n, "sparse") for n in [2, 3, 4]}
+    for numberOfDirections in [2, 3, 4]:
+        matrixCache.get_or_build(keys[numberOfDirections], lambda: build_matrix(numberOfDirections))
+    assert list(matrixCache.matrices) == [keys[3], keys[4]]
+
+    # a matrix dropped from memory is read back from the cache directory rather than built again
+    assert matrixCache.get(keys[2]).shape == (16, 64)
+    assert list(matrixCache.matrices) == [keys[4], keys[2]]
+    assert builtDirections == [2, 3, 4]
+
+def test_scanners_keep_only_their_latest_matrix_by_default():
+    from computed_tomography.func_phantoms import phantom_image, shepp_logan_phantom
+    scanner = CAT_Scanner(phantom_image(shepp_logan_phantom(8, 8)), beam_array_parallel(8, 80, 1))
+    for numberOfDirections in [2, 3, 4]:
+        scanner.scan(numberOfDirections, "dense")
+    assert len(scanner.matrixCache.matrices) == 1
@@ -0,0 +1,29 @@
+from computed_tomography import *
+from computed_tomography.func_phantoms import shepp_logan_phantom
+from numpy import stack, array, allclose
+
+
+def make_volume_scanner(storage):
+    volume = stack([shepp_logan_phantom(16, 16) * (k + 1) / 3 for k in range(3)])
+    volumeScanner = CAT_Volume_Scanner(volume, beam_array_parallel(24, 80, 1), storage=storage)
+    volumeScanner.scan(12, "sparse")
+    return volumeScanner
+
+def test_save_scan_to_the_storage_holding_the_sinograms(tmp_path):
+    storage = ct_storage(str(tmp_path))
+    volumeScanner = make_volume_scanner(storage)
+    originalB = array(volumeScanner.vectorB)
+    assert originalB.max() > 0
+
+    # the sinograms are memory-mapped from storage["vectorB"], which save_scan writes to as well
+    volumeScanner.save_scan(storage)
+    assert allclose(volumeScanner.vectorB, originalB)
+    assert allclose(storage.load_array("vectorB"), originalB)
+
+    # loading the scan and saving it again to the same storage keeps it too
+    loadedScanner = make_volume_scanner(None)
+    loadedScanner.load_scan(storage)
+    loadedScanner.save_scan(storage)
+    assert allclose(loadedScanner.vectorB, originalB)
+    assert allclose(storage.load_array("vectorB"), originalB)
+    assert allclose(loadedScanner.reconstruct_volume(2), volumeScanner.reconstruct_volume(2))